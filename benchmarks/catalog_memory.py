@@ -0,0 +1,84 @@
+# Memory and lookup time of the Catalog against the list of dicts that
+# read_spreadsheet used to return.
+#
+#     python benchmarks/catalog_memory.py [--skus 100000] [--extra-columns 12]
+#
+# Builds a synthetic catalog sheet with the SKU, Title and Barcode columns plus
+# a number of extra columns (prices, vendor, dimensions, ... as in a typical
+# export), then measures the memory each form keeps alive and the time to look
+# up SKUs and barcodes in it. Strings the DataFrame already holds are shared by
+# both forms, so neither is charged for them.
+
+import argparse
+import tracemalloc
+import random
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_catalog_frame(sku_count, extra_columns):
+    import pandas as pd
+
+    rng = random.Random(0)
+    columns = {
+        "SKU": [100000 + i for i in range(sku_count)],
+        "Title": [f"Synthetic product {i} in a realistic length of title" for i in range(sku_count)],
+        "Barcode": [400000000000 + i for i in range(sku_count)],
+    }
+    for column in range(extra_columns):
+        if column % 2:
+            columns[f"Extra {column}"] = [rng.random() * 100 for _ in range(sku_count)]
+        else:
+            columns[f"Extra {column}"] = [f"value {rng.randrange(1000)}" for _ in range(sku_count)]
+    return pd.DataFrame(columns)
+
+def measure(build):
+    # Bytes still allocated once build() has returned, and the result
+    tracemalloc.start()
+    result = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, result
+
+def time_lookups(find, keys):
+    start = time.perf_counter()
+    for key in keys:
+        find(key)
+    return (time.perf_counter() - start) / len(keys)
+
+def main(argv=None):
+    from po_generator.catalog import Catalog
+    from po_generator.barcodes import normalize_barcode
+
+    parser = argparse.ArgumentParser(description="Compare the Catalog with the list-of-dicts catalog.")
+    parser.add_argument("--skus", type=int, default=100000, help="Number of catalog rows (default: 100000).")
+    parser.add_argument("--extra-columns", type=int, default=12, help="Columns besides SKU, Title and Barcode (default: 12).")
+    parser.add_argument("--lookups", type=int, default=200, help="Number of SKU/barcode lookups to time (default: 200).")
+    args = parser.parse_args(argv)
+
+    df = make_catalog_frame(args.skus, args.extra_columns)
+    rng = random.Random(1)
+    skus = [str(100000 + rng.randrange(args.skus)) for _ in range(args.lookups)]
+    barcodes = [str(400000000000 + rng.randrange(args.skus)) for _ in range(args.lookups)]
+
+    records_bytes, records = measure(lambda: df.to_dict(orient="records"))
+    catalog_bytes, catalog = measure(lambda: Catalog(df["SKU"].tolist(), df["Title"].tolist(), df["Barcode"].tolist()))
+
+    # How a SKU or barcode was found in the list of dicts: a scan per lookup
+    def scan_sku(sku):
+        return next((product for product in records if str(product["SKU"]) == sku), None)
+
+    def scan_barcode(barcode):
+        return next((product for product in records if normalize_barcode(product["Barcode"]) == barcode), None)
+
+    print(f"{args.skus} SKUs, {args.extra_columns} extra columns")
+    print(f"{'':24}{'memory':>12}{'SKU lookup':>14}{'barcode lookup':>16}")
+    print(f"{'list of dicts':24}{records_bytes / 1024 / 1024:>9.1f} MB{time_lookups(scan_sku, skus) * 1e6:>11.1f} us{time_lookups(scan_barcode, barcodes) * 1e6:>13.1f} us")
+    print(f"{'Catalog':24}{catalog_bytes / 1024 / 1024:>9.1f} MB{time_lookups(catalog.find_sku, skus) * 1e6:>11.1f} us{time_lookups(catalog.find_barcode, barcodes) * 1e6:>13.1f} us")
+    print(f"Catalog uses {catalog_bytes / records_bytes:.0%} of the memory, indexes included.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Import-time budget check for the po_generator package.
+#
+# Imports the package in a fresh interpreter a few times and fails if the best
+# time is over budget, or if importing it pulls in one of the heavy
+# dependencies that should only load when they are actually used.
+#
+#     python benchmarks/check_import_time.py [--budget-ms 150] [--runs 5]
+
+import argparse
+import subprocess
+import sys
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded by "import po_generator"
+LAZY_MODULES = ["pandas", "numpy", "reportlab", "PIL", "tkinter", "curses", "multiprocessing"]
+
+def measure_import():
+    # Returns the cumulative import time of po_generator in microseconds and
+    # the lazy modules that were loaded with it
+    code = (
+        "import sys, po_generator\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+
+    import_time_us = None
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "po_generator":
+            import_time_us = int(fields[1])
+
+    loaded = [module for module in result.stdout.strip().split(",") if module]
+    return import_time_us, loaded
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of the po_generator package.")
+    parser.add_argument("--budget-ms", type=float, default=150, help="Maximum import time in milliseconds (default: 150).")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to measure (default: 5).")
+    args = parser.parse_args(argv)
+
+    timings = []
+    loaded = set()
+    for _ in range(args.runs):
+        import_time_us, loaded_modules = measure_import()
+        timings.append(import_time_us / 1000)
+        loaded.update(loaded_modules)
+
+    best_ms = min(timings)
+    print(f"import po_generator: best {best_ms:.1f} ms of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"FAILED: importing po_generator loaded {', '.join(sorted(loaded))}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"FAILED: import time is over budget by {best_ms - args.budget_ms:.1f} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
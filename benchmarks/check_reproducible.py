@@ -0,0 +1,107 @@
+# Reproducible-output check for generate_pdf.
+#
+# Renders the sample PO with reproducible=True several times, each in a fresh
+# interpreter, and fails unless every render has the same SHA-256:
+#
+#   1. in a work folder with synthetic assets and an empty thumbnail cache
+#   2. in the same folder again, with the thumbnails now cached
+#   3. in a second folder holding copies of the assets (other paths, newer
+#      modification times) and an empty cache
+#
+#     python benchmarks/check_reproducible.py [--keep]
+
+import argparse
+import tempfile
+import hashlib
+import shutil
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import REPO_ROOT, make_assets
+
+SAMPLE_SPREADSHEET = os.path.join(REPO_ROOT, "Sample Spreadsheet.xlsx")
+
+def run_case(work_dir):
+    # Runs in a child process and prints the hash of every volume
+    import po_generator
+    from po_generator.pdf import volume_files
+
+    os.chdir(work_dir)
+    data_set, meta_data = po_generator.read_spreadsheet(SAMPLE_SPREADSHEET)
+    selected_products = [(1, product["SKU"], product["Title"], product["Barcode"]) for product in data_set]
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+
+    po_generator.generate_pdf(selected_products, meta_data, vector_barcodes=True, attach_designs=True, reproducible=True)
+
+    for pdf_file in volume_files(po_number):
+        with open(pdf_file, "rb") as f:
+            print(f"{hashlib.sha256(f.read()).hexdigest()}  {pdf_file}")
+
+def render(work_dir):
+    # Hash lines of one render in a fresh interpreter, or None if it failed
+    import subprocess
+
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", work_dir],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+    if completed.returncode != 0:
+        print(completed.stderr)
+        return None
+    return [line for line in completed.stdout.splitlines() if len(line.split("  ", 1)[0]) == 64]
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Internal: run a single render in this (child) process
+    if argv and argv[0] == "--run-case":
+        run_case(argv[1])
+        return 0
+
+    parser = argparse.ArgumentParser(description="Check that reproducible renders of the sample PO are byte-for-byte identical.")
+    parser.add_argument("--keep", action="store_true", help="Keep the work folders and the rendered PDFs.")
+    args = parser.parse_args(argv)
+
+    import po_generator
+
+    data_set, meta_data = po_generator.read_spreadsheet(SAMPLE_SPREADSHEET)
+    skus = [product["SKU"] for product in data_set]
+    barcodes = [product["Barcode"] for product in data_set]
+
+    base_dir = tempfile.mkdtemp(prefix="po_generator_reproducible_")
+    first_dir = os.path.join(base_dir, "first")
+    second_dir = os.path.join(base_dir, "second")
+    make_assets(first_dir, skus, barcodes, (3000, 2000), (1600, 1200))
+
+    try:
+        renders = [("fresh cache", first_dir), ("cached thumbnails", first_dir), ("copied assets", second_dir)]
+        results = []
+        for label, work_dir in renders:
+            if work_dir == second_dir and not os.path.isdir(second_dir):
+                # shutil.copy, not copy2: the copies get new modification times
+                shutil.copytree(os.path.join(first_dir, "assets"), os.path.join(second_dir, "assets"), copy_function=shutil.copy)
+
+            hashes = render(work_dir)
+            if hashes is None:
+                print(f"FAILED: the render with {label} did not finish")
+                return 1
+
+            print(f"{label:>18}: {', '.join(line.split('  ', 1)[0][:16] for line in hashes)}")
+            results.append(hashes)
+
+        if any(hashes != results[0] for hashes in results[1:]):
+            print("FAILED: reproducible renders of the same PO differ")
+            return 1
+
+        print(f"OK: {len(results)} renders are identical")
+        return 0
+    finally:
+        if args.keep:
+            print(f"Work folders kept in {base_dir}")
+        else:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+# Benchmarks for read_spreadsheet, generate_pdf and create_output_folder.
+#
+# Builds synthetic workbooks, assets and POs, then times the three stages
+# separately for every catalog size / PO size combination. Each case runs in
+# its own process so its peak RSS isn't inflated by the cases before it.
+#
+#     python benchmarks/run_benchmarks.py --output results.json
+#     python benchmarks/run_benchmarks.py --output new.json --compare results.json
+#
+# With --compare the script exits with 1 if any stage got slower (or used more
+# memory) than the baseline by more than --threshold.
+
+import argparse
+import tempfile
+import shutil
+import random
+import json
+import time
+import sys
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+STAGES = ["read_spreadsheet", "generate_pdf", "create_output_folder"]
+
+# Changes smaller than this are treated as noise, whatever the percentage
+MIN_TIME_DIFFERENCE = 0.05  # seconds
+MIN_RSS_DIFFERENCE = 10  # MB
+
+def peak_rss_mb():
+    # High-water mark of this process's resident memory, or None where the
+    # resource module isn't available (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def folder_size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(folder, name))
+    return total
+
+def make_photo(path, size, seed):
+    # A studio-photo stand-in: smooth gradients plus noise, so the JPEG
+    # compresses about as well as a real photo does
+    from PIL import Image, ImageFilter
+
+    rng = random.Random(seed)
+    noise = Image.effect_noise(size, rng.randint(20, 60)).convert("RGB")
+    tint = Image.new("RGB", size, tuple(rng.randint(0, 255) for _ in range(3)))
+    gradient = Image.linear_gradient("L").resize(size).convert("RGB")
+    image = Image.blend(Image.blend(gradient, tint, 0.5), noise, 0.35).filter(ImageFilter.SMOOTH)
+    image.save(path, "JPEG", quality=92)
+
+def make_drawing(path, size, seed):
+    # Line-art PNG, like a barcode or a design drawing
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(size[0] // 4):
+        x = rng.randrange(size[0])
+        draw.line([(x, 0), (x, size[1])], fill="black", width=rng.randint(1, 3))
+    image.save(path, "PNG")
+
+def make_assets(work_dir, skus, barcodes, photo_size, drawing_size):
+    assets = os.path.join(work_dir, "assets")
+    os.makedirs(assets, exist_ok=True)
+
+    make_photo(os.path.join(assets, "logo.jpg"), (1000, 1000), 0)
+
+    for seed, (sku, barcode) in enumerate(zip(skus, barcodes), start=1):
+        if not os.path.exists(os.path.join(assets, f"{sku}.jpg")):
+            make_photo(os.path.join(assets, f"{sku}.jpg"), photo_size, seed)
+            make_drawing(os.path.join(assets, f"{barcode}.png"), (drawing_size[0] // 2, drawing_size[1] // 4), seed)
+            make_drawing(os.path.join(assets, f"{sku}_DESIGN.png"), drawing_size, seed)
+
+def make_workbook(path, sku_count):
+    # Catalog sheet plus the sample spreadsheet's meta data sheet
+    import pandas as pd
+
+    if os.path.exists(path):
+        return
+
+    catalog = pd.DataFrame({
+        "SKU": [100000 + i for i in range(sku_count)],
+        "Title": [f"Synthetic product {i} in a realistic length of title" for i in range(sku_count)],
+        "Barcode": [400000000000 + i for i in range(sku_count)],
+    })
+    sample = pd.ExcelFile(os.path.join(REPO_ROOT, "Sample Spreadsheet.xlsx"))
+    meta = sample.parse(sample.sheet_names[1])
+
+    with pd.ExcelWriter(path) as writer:
+        catalog.to_excel(writer, sheet_name="Catalog", index=False)
+        meta.to_excel(writer, sheet_name="Additional Info", index=False)
+
+def run_case(work_dir, workbook, line_count, asset_count):
+    # Runs in a child process. Times each stage and prints a JSON result
+    import po_generator
+
+    os.chdir(work_dir)
+    result = {}
+
+    start = time.perf_counter()
+    data_set, meta_data = po_generator.read_spreadsheet(workbook)
+    result["read_spreadsheet"] = {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb(), "output_bytes": 0}
+
+    # Popular SKUs repeat, so the lines cycle through the SKUs that have assets
+    selected_products = [
+        (line % 7 + 1, product["SKU"], product["Title"], product["Barcode"])
+        for line, product in ((line, data_set[line % asset_count]) for line in range(line_count))
+    ]
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+
+    start = time.perf_counter()
+    pdf_file = po_generator.generate_pdf(selected_products, meta_data)
+    result["generate_pdf"] = {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb(), "output_bytes": os.path.getsize(pdf_file)}
+
+    start = time.perf_counter()
+    output_folder = po_generator.create_output_folder(selected_products, meta_data)
+    result["create_output_folder"] = {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb(), "output_bytes": folder_size(output_folder) if output_folder else 0}
+
+    shutil.rmtree(os.path.join("outputs", po_number), ignore_errors=True)
+    print(json.dumps(result))
+
+def run_benchmarks(args):
+    import subprocess
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+
+    asset_count = min(args.asset_count, min(args.catalog_sizes))
+    skus = [100000 + i for i in range(asset_count)]
+    barcodes = [400000000000 + i for i in range(asset_count)]
+
+    print(f"Preparing {asset_count} synthetic SKU asset sets in {work_dir}")
+    make_assets(work_dir, skus, barcodes, tuple(args.photo_size), tuple(args.drawing_size))
+
+    results = {"python": sys.version.split()[0], "cases": {}, "failed": []}
+
+    for sku_count in args.catalog_sizes:
+        workbook = os.path.join(work_dir, f"catalog_{sku_count}.xlsx")
+        print(f"Preparing workbook with {sku_count} SKUs")
+        make_workbook(workbook, sku_count)
+
+        for line_count in args.po_sizes:
+            case = f"skus={sku_count},lines={line_count}"
+
+            # Start every case with cold caches unless asked not to
+            if not args.keep_cache:
+                shutil.rmtree(os.path.join(work_dir, "cache"), ignore_errors=True)
+
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-case", work_dir, workbook, str(line_count), str(asset_count)],
+                capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                print(f"{case}: FAILED\n{completed.stderr}")
+                results["failed"].append(case)
+                continue
+
+            results["cases"][case] = json.loads(completed.stdout.strip().splitlines()[-1])
+            timings = ", ".join(f"{stage} {results['cases'][case][stage]['seconds']:.3f}s" for stage in STAGES)
+            print(f"{case}: {timings}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    return results
+
+def compare(results, baseline, threshold):
+    # Return a list of regression messages, comparing results to the baseline
+    regressions = []
+
+    # A case that crashed, or was not run at all, can't pass the comparison
+    for case in baseline.get("cases", {}):
+        if case in results.get("failed", []):
+            regressions.append(f"{case}: FAILED")
+        elif case not in results["cases"]:
+            regressions.append(f"{case}: missing from the results")
+
+    for case, stages in results["cases"].items():
+        if case not in baseline.get("cases", {}):
+            continue
+
+        for stage in STAGES:
+            new = stages[stage]
+            old = baseline["cases"][case][stage]
+
+            if new["seconds"] > old["seconds"] * (1 + threshold) and new["seconds"] - old["seconds"] > MIN_TIME_DIFFERENCE:
+                regressions.append(f"{case} {stage}: {old['seconds']:.3f}s -> {new['seconds']:.3f}s")
+
+            if new["peak_rss_mb"] and old["peak_rss_mb"] and new["peak_rss_mb"] > old["peak_rss_mb"] * (1 + threshold) and new["peak_rss_mb"] - old["peak_rss_mb"] > MIN_RSS_DIFFERENCE:
+                regressions.append(f"{case} {stage}: peak RSS {old['peak_rss_mb']} MB -> {new['peak_rss_mb']} MB")
+
+    return regressions
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(",")]
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Internal: run a single case in this (child) process
+    if argv and argv[0] == "--run-case":
+        work_dir, workbook, line_count, asset_count = argv[1:5]
+        run_case(work_dir, workbook, int(line_count), int(asset_count))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmark the PO generator on synthetic data.")
+    parser.add_argument("--catalog-sizes", type=parse_sizes, default=[1000, 10000, 100000], help="Comma-separated catalog sizes in SKUs (default: 1000,10000,100000).")
+    parser.add_argument("--po-sizes", type=parse_sizes, default=[10, 500, 5000], help="Comma-separated PO sizes in lines (default: 10,500,5000).")
+    parser.add_argument("--asset-count", type=int, default=200, help="Number of SKUs that get synthetic assets (default: 200).")
+    parser.add_argument("--photo-size", type=int, nargs=2, default=[3000, 2000], metavar=("W", "H"), help="Size of the synthetic SKU photos (default: 3000 2000).")
+    parser.add_argument("--drawing-size", type=int, nargs=2, default=[1600, 1200], metavar=("W", "H"), help="Size of the synthetic design drawings (default: 1600 1200).")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "po_generator_benchmarks"), help="Where the synthetic data is generated (reused between runs).")
+    parser.add_argument("--keep-cache", action="store_true", help="Don't clear the image caches between cases.")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file for the results (default: bench_results.json).")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a previous results file and fail on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before a stage counts as a regression (default: 0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    failed = bool(results["failed"])
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        if not failed:
+            print("No regressions against the baseline.")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
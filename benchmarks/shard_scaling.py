@@ -0,0 +1,112 @@
+# Render time of one long PO as the number of shards grows.
+#
+#     python benchmarks/shard_scaling.py [--lines 20000] [--shards 1,2,4,8]
+#
+# With shards=N, generate_pdf draws the PO's pages in N worker processes and
+# puts them together into one PDF. Every case runs in its own process, on the
+# synthetic assets and workbook of run_benchmarks.py, renders with
+# reproducible=True and reports whether its PDF is byte-for-byte the same as
+# the serial (1 shard) render. Speed-up is bounded by the CPU cores available.
+
+import argparse
+import tempfile
+import hashlib
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import REPO_ROOT, make_assets, make_workbook, parse_sizes
+
+def run_case(work_dir, workbook, line_count, asset_count, shards):
+    # Runs in a child process and prints a JSON result
+    import po_generator
+
+    os.chdir(work_dir)
+    data_set, meta_data = po_generator.read_spreadsheet(workbook)
+
+    selected_products = [
+        (line % 7 + 1, product["SKU"], product["Title"], product["Barcode"])
+        for line, product in ((line, data_set[line % asset_count]) for line in range(line_count))
+    ]
+
+    start = time.perf_counter()
+    pdf_file = po_generator.generate_pdf(selected_products, meta_data, reproducible=True, shards=shards)
+    seconds = time.perf_counter() - start
+
+    with open(pdf_file, "rb") as f:
+        data = f.read()
+    os.remove(pdf_file)
+
+    print(json.dumps({"seconds": seconds, "output_bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}))
+
+def main(argv=None):
+    import subprocess
+
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Internal: run a single case in this (child) process
+    if argv and argv[0] == "--run-case":
+        work_dir, workbook, line_count, asset_count, shards = argv[1:6]
+        run_case(work_dir, workbook, int(line_count), int(asset_count), int(shards))
+        return 0
+
+    cpu_count = os.cpu_count() or 1
+    default_shards = [1]
+    while default_shards[-1] * 2 <= max(cpu_count, 4):
+        default_shards.append(default_shards[-1] * 2)
+
+    parser = argparse.ArgumentParser(description="Measure how generate_pdf scales with the number of shards.")
+    parser.add_argument("--lines", type=int, default=20000, help="Line items in the PO (default: 20000).")
+    parser.add_argument("--shards", type=parse_sizes, default=default_shards, help=f"Comma-separated shard counts (default: {','.join(map(str, default_shards))}).")
+    parser.add_argument("--asset-count", type=int, default=50, help="Number of SKUs with synthetic assets (default: 50).")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "po_generator_benchmarks"), help="Where the synthetic data is generated (reused between runs).")
+    args = parser.parse_args(argv)
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+
+    skus = [100000 + i for i in range(args.asset_count)]
+    barcodes = [400000000000 + i for i in range(args.asset_count)]
+    print(f"Preparing {args.asset_count} synthetic SKU asset sets in {work_dir}")
+    make_assets(work_dir, skus, barcodes, (3000, 2000), (1600, 1200))
+
+    workbook = os.path.join(work_dir, "catalog_1000.xlsx")
+    make_workbook(workbook, 1000)
+
+    def render(shards):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-case", work_dir, workbook, str(args.lines), str(args.asset_count), str(shards)],
+            capture_output=True, text=True, cwd=REPO_ROOT
+        )
+        if completed.returncode != 0:
+            print(f"{shards:>8}: FAILED\n{completed.stderr}")
+            return None
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    # A first render makes the thumbnails, so every timed one reuses them
+    print(f"{args.lines} lines on {cpu_count} CPU core(s)")
+    if render(1) is None:
+        return 1
+
+    print(f"{'shards':>8}{'seconds':>9}{'speed-up':>10}{'PDF MB':>9}  same as serial")
+
+    serial = None
+    failed = False
+    for shards in [1] + [shards for shards in args.shards if shards != 1]:
+        result = render(shards)
+        if result is None:
+            failed = True
+            continue
+
+        serial = serial or result
+        same = "yes" if result["sha256"] == serial["sha256"] else "NO"
+        failed = failed or same == "NO"
+        print(f"{shards:>8}{result['seconds']:>9.2f}{serial['seconds'] / result['seconds']:>9.2f}x{result['output_bytes'] / 1024 / 1024:>9.1f}  {same}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
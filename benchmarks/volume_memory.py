@@ -0,0 +1,105 @@
+# Peak memory of generate_pdf as the PO grows, rendered as one PDF and as
+# numbered volumes.
+#
+#     python benchmarks/volume_memory.py [--po-sizes 1000,5000,20000,50000] [--max-pages 100]
+#
+# reportlab keeps every page of a PDF in memory until it is saved, so a single
+# PDF's peak RSS grows with the line count. Split into volumes of --max-pages
+# pages, only one volume is in memory at a time and the peak should stay
+# about flat. Each case runs in its own process, on the synthetic assets and
+# workbook of run_benchmarks.py.
+
+import argparse
+import tempfile
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import REPO_ROOT, peak_rss_mb, make_assets, make_workbook, parse_sizes
+
+def run_case(work_dir, workbook, line_count, asset_count, max_pages):
+    # Runs in a child process and prints a JSON result
+    import po_generator
+    from po_generator.pdf import volume_files
+
+    os.chdir(work_dir)
+    data_set, meta_data = po_generator.read_spreadsheet(workbook)
+
+    selected_products = [
+        (line % 7 + 1, product["SKU"], product["Title"], product["Barcode"])
+        for line, product in ((line, data_set[line % asset_count]) for line in range(line_count))
+    ]
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+
+    # What reading the workbook and building the lines cost, so the render
+    # can be told apart from it
+    before_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    po_generator.generate_pdf(selected_products, meta_data, max_pages=max_pages or None)
+    seconds = time.perf_counter() - start
+
+    pdf_files = volume_files(po_number)
+    result = {
+        "seconds": seconds,
+        "before_rss_mb": before_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "volumes": len(pdf_files),
+        "output_bytes": sum(os.path.getsize(pdf_file) for pdf_file in pdf_files),
+    }
+    for pdf_file in pdf_files:
+        os.remove(pdf_file)
+    print(json.dumps(result))
+
+def main(argv=None):
+    import subprocess
+
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Internal: run a single case in this (child) process
+    if argv and argv[0] == "--run-case":
+        work_dir, workbook, line_count, asset_count, max_pages = argv[1:6]
+        run_case(work_dir, workbook, int(line_count), int(asset_count), int(max_pages))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Measure generate_pdf's peak memory with and without volumes.")
+    parser.add_argument("--po-sizes", type=parse_sizes, default=[1000, 5000, 20000, 50000], help="Comma-separated PO sizes in lines (default: 1000,5000,20000,50000).")
+    parser.add_argument("--max-pages", type=int, default=100, help="Pages per volume for the split runs (default: 100).")
+    parser.add_argument("--asset-count", type=int, default=50, help="Number of SKUs with synthetic assets (default: 50).")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "po_generator_benchmarks"), help="Where the synthetic data is generated (reused between runs).")
+    args = parser.parse_args(argv)
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+
+    skus = [100000 + i for i in range(args.asset_count)]
+    barcodes = [400000000000 + i for i in range(args.asset_count)]
+    print(f"Preparing {args.asset_count} synthetic SKU asset sets in {work_dir}")
+    make_assets(work_dir, skus, barcodes, (3000, 2000), (1600, 1200))
+
+    workbook = os.path.join(work_dir, "catalog_1000.xlsx")
+    make_workbook(workbook, 1000)
+
+    print(f"{'lines':>8}{'mode':>18}{'volumes':>9}{'seconds':>9}{'PDF MB':>9}{'render MB':>11}{'peak MB':>9}")
+    for line_count in args.po_sizes:
+        for max_pages in (0, args.max_pages):
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-case", work_dir, workbook, str(line_count), str(args.asset_count), str(max_pages)],
+                capture_output=True, text=True, cwd=REPO_ROOT
+            )
+            mode = f"{max_pages}-page volumes" if max_pages else "one PDF"
+            if completed.returncode != 0:
+                print(f"{line_count:>8}{mode:>18}: FAILED\n{completed.stderr}")
+                continue
+
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            render_mb = result["peak_rss_mb"] - result["before_rss_mb"] if result["peak_rss_mb"] else 0
+            print(f"{line_count:>8}{mode:>18}{result['volumes']:>9}{result['seconds']:>9.2f}{result['output_bytes'] / 1024 / 1024:>9.1f}{render_mb:>11.1f}{result['peak_rss_mb'] or 0:>9.1f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+# PO Generator: builds purchase order PDFs from a SKU spreadsheet.
+#
+# Importing the package is cheap and has no side effects. pandas, reportlab,
+# PIL, curses and tkinter are only imported by the functions that need them.
+
+from .spreadsheet import read_spreadsheet, read_workbook, read_order_file
+from .catalog import Catalog
+from .pdf import generate_pdf
+from .output import create_output_folder
+from .cli import main
+
+__all__ = [
+    "read_spreadsheet",
+    "read_workbook",
+    "read_order_file",
+    "Catalog",
+    "generate_pdf",
+    "create_output_folder",
+    "main",
+]
@@ -0,0 +1,6 @@
+import sys
+
+from .cli import main
+
+# Entry point: python -m po_generator
+sys.exit(main())
@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime
+import struct
+import zlib
+import time
+import io
+import os
+
+from .barcodes import generate_barcode_sheet
+from .pdf import volume_files
+from .instrumentation import timed, add_count
+
+ARCHIVE_FORMATS = ["zip", "tar.zst"]
+
+# Deflate level for zip members, and the zstd level for tar.zst archives
+ZIP_COMPRESSION_LEVEL = 6
+ZSTD_COMPRESSION_LEVEL = 3
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+def dos_date_time(timestamp):
+    # Zip timestamps are DOS date/time pairs, 2 second resolution, 1980 onwards
+    moment = datetime.fromtimestamp(max(timestamp, 315532800))
+    dos_time = moment.hour << 11 | moment.minute << 5 | moment.second // 2
+    dos_date = (moment.year - 1980) << 9 | moment.month << 5 | moment.day
+    return dos_time, dos_date
+
+def read_member(source):
+    # Members are either a file path or bytes generated in memory
+    if isinstance(source, bytes):
+        return source, time.time()
+
+    with open(source, "rb") as f:
+        return f.read(), os.path.getmtime(source)
+
+@timed("compress_member")
+def compress_member(source, level=ZIP_COMPRESSION_LEVEL):
+    # Runs in the compression threads; zlib releases the GIL while it works,
+    # so members are compressed in parallel. Members that don't shrink
+    # (PNGs usually don't) are stored as they are
+    data, mtime = read_member(source)
+    crc = zlib.crc32(data)
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    packed = compressor.compress(data) + compressor.flush()
+    if len(packed) < len(data):
+        return ZIP_DEFLATED, crc, len(data), packed, mtime
+
+    return ZIP_STORED, crc, len(data), data, mtime
+
+def write_zip(f, members, workers=None):
+    # Stream the members into a zip file: each member is read and compressed
+    # in a thread pool, then its header and data are written in order. Only
+    # a few members are held in memory at a time
+    workers = workers or os.cpu_count() or 1
+    central_directory = []
+    offset = 0
+
+    if len(members) > 0xFFFF:
+        raise ValueError(f"Too many files for a zip archive ({len(members)})")
+
+    def write_member(name, future):
+        nonlocal offset
+
+        method, crc, size, data, mtime = future.result()
+        if offset + len(data) > 0xFFFFFFFF:
+            raise ValueError("The zip archive would be over 4 GB; use tar.zst instead")
+
+        encoded_name = name.encode("utf-8")
+        dos_time, dos_date = dos_date_time(mtime)
+
+        # Flag 0x800: the file name is UTF-8
+        header = struct.pack("<4sHHHHHLLLHH", b"PK\x03\x04", 20, 0x800, method, dos_time, dos_date, crc, len(data), size, len(encoded_name), 0)
+        f.write(header + encoded_name)
+        f.write(data)
+
+        central_directory.append(struct.pack("<4sHHHHHHLLLHHHHHLL", b"PK\x01\x02", 20, 20, 0x800, method, dos_time, dos_date, crc, len(data), size, len(encoded_name), 0, 0, 0, 0, 0o644 << 16, offset) + encoded_name)
+        offset += len(header) + len(encoded_name) + len(data)
+
+        add_count("archive_members")
+        add_count("archive_source_bytes", size)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        for name, source in members:
+            pending.append((name, executor.submit(compress_member, source)))
+
+            # Keep the pool busy without reading every member up front
+            if len(pending) >= workers * 2:
+                write_member(*pending.popleft())
+
+        while pending:
+            write_member(*pending.popleft())
+
+    directory = b"".join(central_directory)
+    f.write(directory)
+    f.write(struct.pack("<4sHHHHLLH", b"PK\x05\x06", 0, 0, len(central_directory), len(central_directory), len(directory), offset, 0))
+
+def write_tar_zst(f, members, workers=None):
+    # Stream the members into a tar inside a zstd frame. zstd compresses the
+    # stream with its own worker threads
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError("tar.zst archives need the zstandard package (pip install zstandard)") from e
+    import tarfile
+
+    compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL, threads=workers or -1)
+
+    with compressor.stream_writer(f, closefd=False) as stream:
+        with tarfile.open(fileobj=stream, mode="w|") as tar:
+            for name, source in members:
+                data, mtime = read_member(source)
+
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(mtime)
+                info.mode = 0o644
+                tar.addfile(info, io.BytesIO(data))
+
+                add_count("archive_members")
+                add_count("archive_source_bytes", len(data))
+
+@timed("create_output_archive")
+def create_output_archive(selected_products, meta_data, archive_format="zip", barcode_sheet=False, include_designs=True, workers=None):
+    # Like create_output_folder, but everything for the PO goes straight into
+    # outputs/{po_number}.zip (or .tar.zst) without staging loose files.
+    # Returns the archive path, or None on error
+
+    source_folder = "assets"
+    destination_folder = "outputs"
+
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+
+    if archive_format not in ARCHIVE_FORMATS:
+        print(f"Unknown archive format '{archive_format}'.")
+        return None
+
+    archive_file = os.path.join(destination_folder, f"{po_number}.{archive_format}")
+
+    # Write to a temporary name so a failed run never leaves a partial archive
+    temporary_file = f"{archive_file}.{os.getpid()}.tmp"
+
+    try:
+        if not os.path.exists(source_folder):
+            print(f"Source folder '{source_folder}' does not exist.")
+            return None
+
+        # Member name -> file path (or generated bytes). Repeated SKUs and
+        # barcodes go in once
+        members = {pdf_file: pdf_file for pdf_file in volume_files(po_number)}
+
+        if barcode_sheet:
+            sheet = io.BytesIO()
+            generate_barcode_sheet(selected_products, sheet)
+            members[f"{po_number}_barcodes.pdf"] = sheet.getvalue()
+
+        for qty, sku, title, barcode in selected_products:
+            if not barcode_sheet:
+                members[f"{barcode}.png"] = os.path.join(source_folder, f"{barcode}.png")
+            if include_designs:
+                members[f"{sku}_DESIGN.png"] = os.path.join(source_folder, f"{sku}_DESIGN.png")
+
+        # Check every file up front rather than failing halfway through the archive
+        missing = [source for source in members.values() if isinstance(source, str) and not os.path.exists(source)]
+        if missing:
+            print(f"Missing files: {', '.join(missing)}")
+            return None
+
+        os.makedirs(destination_folder, exist_ok=True)
+
+        with open(temporary_file, "wb") as f:
+            if archive_format == "zip":
+                write_zip(f, list(members.items()), workers)
+            else:
+                write_tar_zst(f, list(members.items()), workers)
+
+        os.replace(temporary_file, archive_file)
+        add_count("archive_bytes", os.path.getsize(archive_file))
+
+        # The PDF now lives in the archive
+        for pdf_file in volume_files(po_number):
+            os.remove(pdf_file)
+
+        print(f"Archive written to '{archive_file}' with {len(members)} files.")
+        return archive_file
+
+    except Exception as e:
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+        print(f"An error occurred: {str(e)}")
+        return None
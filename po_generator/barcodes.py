@@ -0,0 +1,114 @@
+import hashlib
+
+from .instrumentation import timed, add_count
+
+def normalize_barcode(barcode):
+    # Spreadsheet barcodes usually come back as numbers (or floats like 1.2e11)
+    if isinstance(barcode, float) and barcode.is_integer():
+        barcode = int(barcode)
+    return str(barcode).strip()
+
+def check_digit(digits):
+    # GS1 check digit for EAN-13/UPC-A: weights 3,1,3,... from the right
+    total = sum(int(digit) * (3 if i % 2 == 0 else 1) for i, digit in enumerate(reversed(digits)))
+    return str((10 - total % 10) % 10)
+
+def barcode_type(barcode):
+    # Pick the symbology from the value. Returns (kind, value to encode).
+    # Valid 12-digit UPC-A and 13-digit EAN-13 codes (check digit included) are
+    # drawn as such; everything else falls back to Code 128
+    value = normalize_barcode(barcode)
+
+    if value.isdigit():
+        # A UPC-A code that lost its leading zero on the way through Excel
+        if len(value) == 11:
+            upc = value.zfill(12)
+            if check_digit(upc[:-1]) == upc[-1]:
+                return "UPCA", upc[:-1]
+
+        if len(value) == 12 and check_digit(value[:-1]) == value[-1]:
+            return "UPCA", value[:-1]
+
+        if len(value) == 13 and check_digit(value[:-1]) == value[-1]:
+            return "EAN13", value[:-1]
+
+    return "Code128", value
+
+def barcode_drawing(barcode, width, height):
+    # A vector drawing of the barcode (bars plus digits) that fits in width x height
+    from reportlab.graphics.barcode import createBarcodeDrawing
+
+    kind, value = barcode_type(barcode)
+
+    # Draw it once to find the natural width and the space the digits take,
+    # then pick a bar height that fills the box once scaled to its width
+    drawing = createBarcodeDrawing(kind, value=value, humanReadable=True, barHeight=height)
+    text_height = drawing.height - height
+    scale = width / drawing.width
+    bar_height = max(5, height / scale - text_height)
+
+    drawing = createBarcodeDrawing(kind, value=value, humanReadable=True, barHeight=bar_height)
+    scale = min(width / drawing.width, height / drawing.height)
+
+    drawing.scale(scale, scale)
+    drawing.width = drawing.width * scale
+    drawing.height = drawing.height * scale
+    return drawing
+
+@timed("draw_barcode")
+def draw_barcode(c, barcode, x, y, width, height):
+    # Draw the barcode centred in the box. Each barcode is stored once per
+    # document as a form and referenced wherever it appears again
+    from reportlab.graphics import renderPDF
+
+    value = normalize_barcode(barcode)
+    key = f"{value}|{width:g}x{height:g}"
+    form_name = "barcode_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    if not c.hasForm(form_name):
+        drawing = barcode_drawing(value, width, height)
+        c.beginForm(form_name, 0, 0, width, height)
+        renderPDF.draw(drawing, c, (width - drawing.width) / 2, (height - drawing.height) / 2)
+        c.endForm()
+        add_count("barcodes_drawn")
+
+    c.saveState()
+    c.translate(x, y)
+    c.doForm(form_name)
+    c.restoreState()
+
+@timed("barcode_sheet")
+def generate_barcode_sheet(selected_products, pdf_file):
+    # One labelled barcode per SKU of the PO, in a grid of labels on letter
+    # pages. Replaces the copied {barcode}.png files
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+
+    c = canvas.Canvas(pdf_file, pagesize=letter)
+    page_width, page_height = letter
+
+    margin = 0.5 * 72
+    columns = 3
+    label_width = (page_width - 2 * margin) / columns
+    label_height = 90
+    rows = int((page_height - 2 * margin) // label_height)
+
+    # Each SKU once, in order of first appearance
+    labels = list(dict.fromkeys((sku, title, normalize_barcode(barcode)) for qty, sku, title, barcode in selected_products))
+
+    for index, (sku, title, barcode) in enumerate(labels):
+        if index and index % (columns * rows) == 0:
+            c.showPage()
+
+        position = index % (columns * rows)
+        x = margin + (position % columns) * label_width
+        y = page_height - margin - (position // columns + 1) * label_height
+
+        c.setFont("Helvetica-Bold", 9)
+        c.drawString(x + 6, y + label_height - 14, f"{sku}")
+        c.setFont("Helvetica", 8)
+        c.drawString(x + 6, y + label_height - 25, f"{title}"[:40])
+        draw_barcode(c, barcode, x + 6, y + 6, label_width - 12, label_height - 36)
+
+    c.save()
+    return pdf_file
@@ -0,0 +1,75 @@
+import json
+import os
+
+from .pdf import generate_pdf, attach_files
+from .instrumentation import timed, add_count
+
+def manifest_file(binder_file):
+    # binder.pdf -> binder.json
+    return os.path.splitext(binder_file)[0] + ".json"
+
+@timed("generate_binder")
+def generate_binder(jobs, binder_file, render_options=None):
+    # Render the POs one after another into a single PDF for the print room.
+    # Everything is drawn on one canvas, so the fonts, the letterhead (one
+    # form per company) and every SKU image are embedded once and shared by
+    # all the POs that use them. Each PO starts on a new page with its own
+    # bookmark, keeps its own "Page X of Y" numbering, and is labelled
+    # "{po_number} - 1", "{po_number} - 2", ... in the viewer's page list.
+    # Writes a {binder}.json manifest of the page ranges and returns it
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+
+    # A binder is always one file, and the design files are attached to the
+    # binder rather than to each PO
+    render_options = dict(render_options or {}, max_pages=None, max_volume_bytes=None)
+    attach_designs = render_options.pop("attach_designs", False)
+
+    c = canvas.Canvas(binder_file, pagesize=letter, pageCompression=1, invariant=1 if render_options.get("reproducible") else None)
+    c.setTitle(f"Purchase Order Binder ({len(jobs)} purchase orders)")
+    c.setSubject("Purchase orders")
+    c.setCreator("PO Generator")
+
+    entries = []
+    for index, (selected_products, meta_data) in enumerate(jobs):
+        po_number = f"{meta_data.get('po_number', 'N/A')}"
+        if index:
+            c.showPage()
+
+        first_page = c.getPageNumber()
+        key = f"po_{index + 1}"
+        c.bookmarkPage(key)
+        c.addOutlineEntry(po_number, key, level=0)
+        c.addPageLabel(first_page - 1, "ARABIC", start=1, prefix=f"{po_number} - ")
+
+        generate_pdf(selected_products, meta_data, into=c, letterhead_form=True, **render_options)
+
+        last_page = c.getPageNumber()
+        entries.append({
+            "po_number": po_number,
+            "first_page": first_page,
+            "last_page": last_page,
+            "pages": last_page - first_page + 1,
+            "line_items": len(selected_products),
+        })
+
+    if attach_designs:
+        attach_files(c, [os.path.join("assets", f"{sku}_DESIGN.png") for selected_products, meta_data in jobs for qty, sku, title, barcode in selected_products])
+
+    # Open with the bookmarks showing
+    c.showOutline()
+
+    with timed("pdf_save"):
+        c.save()
+    add_count("pdf_bytes", os.path.getsize(binder_file))
+
+    manifest = {
+        "binder": os.path.basename(binder_file),
+        "pages": entries[-1]["last_page"] if entries else 0,
+        "purchase_orders": entries,
+    }
+    with open(manifest_file(binder_file), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Binder generated: {binder_file} ({len(entries)} purchase orders, {manifest['pages']} pages)")
+    return manifest
@@ -0,0 +1,87 @@
+from collections.abc import Mapping, Sequence
+from array import array
+
+from .barcodes import normalize_barcode
+
+# The only catalog columns the generator uses
+CATALOG_COLUMNS = ['SKU', 'Title', 'Barcode']
+
+# Optional unit price column, under the first of these names found in the sheet
+PRICE_COLUMNS = ['Unit Price (USD)', 'Unit Price', 'Price']
+
+def compact_column(values):
+    # Whole numbers (SKUs and barcodes usually are) are kept in a typed array
+    # at 8 bytes each instead of a list of int objects; anything else stays a list
+    if values and all(type(value) is int and -2**63 <= value < 2**63 for value in values):
+        return array('q', values)
+    return list(values)
+
+class Catalog(Sequence):
+    # The SKU sheet as three columns (four with unit prices), with hash
+    # indexes on SKU and barcode. Rows are handed out as small {"SKU",
+    # "Title", "Barcode"} dicts (plus "Price") built on access, so code written
+    # for the list of dicts read_spreadsheet used to return (the picker,
+    # generate_pdf's callers) works unchanged
+    __slots__ = ("skus", "titles", "barcodes", "prices", "sku_positions", "barcode_positions")
+
+    def __init__(self, skus, titles, barcodes, prices=None):
+        self.skus = compact_column(skus)
+        self.titles = list(titles)
+        self.barcodes = compact_column(barcodes)
+        self.prices = list(prices) if prices is not None else None
+
+        # Keyed as strings, like index_by_sku: order files and scanners give
+        # text while the spreadsheet gives numbers
+        self.sku_positions = {str(sku): position for position, sku in enumerate(self.skus)}
+        self.barcode_positions = {normalize_barcode(barcode): position for position, barcode in enumerate(self.barcodes)}
+
+    @classmethod
+    def from_rows(cls, rows):
+        # From the list-of-dicts form (e.g. rows read back from the catalog store)
+        prices = [row.get('Price') for row in rows] if rows and 'Price' in rows[0] else None
+        return cls([row['SKU'] for row in rows], [row['Title'] for row in rows], [row['Barcode'] for row in rows], prices)
+
+    def __len__(self):
+        return len(self.skus)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        row = {"SKU": self.skus[position], "Title": self.titles[position], "Barcode": self.barcodes[position]}
+        if self.prices is not None:
+            row["Price"] = self.prices[position]
+        return row
+
+    def by_sku(self):
+        return CatalogIndex(self, self.sku_positions)
+
+    def by_barcode(self):
+        return CatalogIndex(self, self.barcode_positions)
+
+    def find_sku(self, sku):
+        # The row for a SKU, or None
+        return self.by_sku().get(str(sku))
+
+    def find_barcode(self, barcode):
+        # The row for a barcode, or None
+        return self.by_barcode().get(normalize_barcode(barcode))
+
+class CatalogIndex(Mapping):
+    # Read-only {key: row} view over one of a Catalog's indexes
+    __slots__ = ("catalog", "positions")
+
+    def __init__(self, catalog, positions):
+        self.catalog = catalog
+        self.positions = positions
+
+    def __getitem__(self, key):
+        return self.catalog[self.positions[key]]
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
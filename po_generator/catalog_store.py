@@ -0,0 +1,142 @@
+from datetime import datetime
+import sqlite3
+import hashlib
+import json
+import os
+
+from .spreadsheet import read_spreadsheet
+from .catalog import Catalog
+from .instrumentation import timed
+
+# Local SQLite copy of the catalog sheet, so later runs don't re-parse the workbook
+CATALOG_STORE_PATH = os.path.join("cache", "catalog.sqlite3")
+
+def to_json_value(value):
+    # Spreadsheet values that json can't encode on its own
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')  # the format generate_pdf parses
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalars
+    raise TypeError(f"Cannot store {type(value).__name__} in the catalog store")
+
+def open_catalog_store(db_path=CATALOG_STORE_PATH):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    connection = sqlite3.connect(db_path)
+
+    connection.executescript('''
+        CREATE TABLE IF NOT EXISTS workbooks (
+            workbook TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            meta_data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS products (
+            workbook TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            sku TEXT NOT NULL,
+            barcode TEXT NOT NULL,
+            row TEXT NOT NULL,
+            PRIMARY KEY (workbook, sku)
+        );
+        CREATE INDEX IF NOT EXISTS products_position ON products (workbook, position);
+    ''')
+
+    return connection
+
+@timed("import_workbook")
+def import_workbook(connection, file_path):
+    # Bring the store up to date with the workbook. Returns None if the
+    # workbook hasn't changed since the last import, otherwise the number of
+    # added, updated and removed SKUs
+    workbook = os.path.abspath(file_path)
+
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    stored = connection.execute("SELECT sha256 FROM workbooks WHERE workbook = ?", (workbook,)).fetchone()
+    if stored and stored[0] == digest:
+        return None
+
+    data_set, meta_data = read_spreadsheet(file_path)
+
+    new_rows = {}
+    new_positions = {}
+    for position, product in enumerate(data_set):
+        sku = str(product['SKU'])
+        if sku in new_rows:
+            raise ValueError(f"The spreadsheet lists SKU {sku} more than once.")
+        new_rows[sku] = (str(product['Barcode']), json.dumps(product, default=to_json_value))
+        new_positions[sku] = position
+
+    old_rows = {}
+    old_positions = {}
+    for sku, position, barcode, row in connection.execute("SELECT sku, position, barcode, row FROM products WHERE workbook = ?", (workbook,)):
+        old_rows[sku] = (barcode, row)
+        old_positions[sku] = position
+
+    # Only write the rows whose content differs from the last import. A row
+    # inserted or deleted higher up the sheet shifts the ones below it, so
+    # positions are compared (and only the position rewritten) separately
+    added = [sku for sku in new_rows if sku not in old_rows]
+    updated = [sku for sku in new_rows if sku in old_rows and new_rows[sku] != old_rows[sku]]
+    removed = [sku for sku in old_rows if sku not in new_rows]
+    moved = [sku for sku in new_rows if sku in old_rows and new_rows[sku] == old_rows[sku] and new_positions[sku] != old_positions[sku]]
+
+    with connection:
+        connection.executemany("DELETE FROM products WHERE workbook = ? AND sku = ?", [(workbook, sku) for sku in removed])
+        connection.executemany(
+            "INSERT OR REPLACE INTO products (workbook, position, sku, barcode, row) VALUES (?, ?, ?, ?, ?)",
+            [(workbook, new_positions[sku], sku) + new_rows[sku] for sku in added + updated]
+        )
+        connection.executemany(
+            "UPDATE products SET position = ? WHERE workbook = ? AND sku = ?",
+            [(new_positions[sku], workbook, sku) for sku in moved]
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO workbooks (workbook, sha256, meta_data) VALUES (?, ?, ?)",
+            (workbook, digest, json.dumps(meta_data, default=to_json_value))
+        )
+
+    return len(added), len(updated), len(removed)
+
+def load_meta_data(connection, file_path):
+    row = connection.execute("SELECT meta_data FROM workbooks WHERE workbook = ?", (os.path.abspath(file_path),)).fetchone()
+    if row is None:
+        raise ValueError(f"The workbook '{file_path}' has not been imported.")
+    return json.loads(row[0])
+
+@timed("load_catalog")
+def load_catalog(connection, file_path):
+    # Same result as read_spreadsheet, but read from the store
+    rows = connection.execute("SELECT row FROM products WHERE workbook = ? ORDER BY position", (os.path.abspath(file_path),))
+    data_set = Catalog.from_rows([json.loads(row) for row, in rows])
+    return data_set, load_meta_data(connection, file_path)
+
+def lookup_skus(connection, file_path, skus):
+    # Fetch only the requested rows through the SKU index
+    products = {}
+    skus = list(dict.fromkeys(str(sku) for sku in skus))
+    workbook = os.path.abspath(file_path)
+
+    # Stay under SQLite's limit on query parameters
+    for start in range(0, len(skus), 500):
+        chunk = skus[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        query = f"SELECT sku, row FROM products WHERE workbook = ? AND sku IN ({placeholders})"
+        for sku, row in connection.execute(query, [workbook] + chunk):
+            products[sku] = json.loads(row)
+
+    return products
+
+def read_spreadsheet_from_store(file_path):
+    # read_spreadsheet, backed by the catalog store
+    connection = open_catalog_store()
+    try:
+        import_workbook(connection, file_path)
+        return load_catalog(connection, file_path)
+    except sqlite3.Error as e:
+        raise ValueError(f"Error reading the catalog store: {e}") from e
+    finally:
+        connection.close()
@@ -0,0 +1,380 @@
+from collections import Counter
+import argparse
+import sqlite3
+import time
+import sys
+import os
+
+from .spreadsheet import read_spreadsheet, read_workbook, read_order_lines, index_by_sku, normalize_order_line, parse_order_lines
+from .catalog_store import open_catalog_store, import_workbook, load_meta_data, lookup_skus, read_spreadsheet_from_store
+from .picker import open_file_dialog, get_user_input
+from .pricing import apply_pricing
+from .render_cache import render_pdf
+from .pdf import check_po_number
+from .images import THUMBNAIL_DPI, THUMBNAIL_JPEG_QUALITY
+from .output import find_missing_assets, create_output_folder
+from .archive import ARCHIVE_FORMATS, create_output_archive
+from .instrumentation import reset_record, snapshot_record, write_record
+
+def render_and_package(selected_products, meta_data, use_asset_store=False, render_options=None, barcode_sheet=False, archive_format=None):
+    # Render the PDF and put it, with its assets, in the PO folder or archive.
+    # Raises ValueError if any asset is missing; returns an error message for
+    # anything else that failed, or None on success
+    render_options = render_options or {}
+    include_designs = not render_options.get("attach_designs")
+
+    # Every asset is checked before anything is rendered or copied
+    missing = find_missing_assets(selected_products, barcode_sheet)
+    if missing:
+        raise ValueError(f"Missing assets: {', '.join(missing)}")
+
+    def render():
+        render_pdf(selected_products, meta_data, render_options)
+
+    try:
+        if archive_format:
+            render()
+            if create_output_archive(selected_products, meta_data, archive_format, barcode_sheet, include_designs) is None:
+                return "Failed to create the output archive"
+        else:
+            # The assets copy while the PDF renders
+            if create_output_folder(selected_products, meta_data, use_asset_store, barcode_sheet, include_designs, render) is None:
+                return "Failed to create the output folder"
+    except Exception as e:
+        return f"Failed to generate PDF: {e}"
+
+    return None
+
+def run_headless(file_path, order_path, use_asset_store=False, use_catalog_store=False, render_options=None, barcode_sheet=False, archive_format=None):
+    # Build the PO entirely from files, without curses or tkinter, and
+    # return an exit code suitable for scripts
+    try:
+        if use_catalog_store:
+            # Only the ordered SKUs are read from the store
+            order = read_order_lines(order_path)
+            connection = open_catalog_store()
+            try:
+                import_workbook(connection, file_path)
+                meta_data = load_meta_data(connection, file_path)
+                products_by_sku = lookup_skus(connection, file_path, [normalize_order_line(line)[0] for line in order])
+            except sqlite3.Error as e:
+                raise ValueError(f"Error reading the catalog store: {e}") from e
+            finally:
+                connection.close()
+            selected_products = parse_order_lines(order, products_by_sku)
+        else:
+            data_set, meta_data = read_spreadsheet(file_path)
+            products_by_sku = index_by_sku(data_set)
+            selected_products = parse_order_lines(read_order_lines(order_path), products_by_sku)
+
+        meta_data = apply_pricing(selected_products, products_by_sku, meta_data)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    try:
+        error = render_and_package(selected_products, meta_data, use_asset_store, render_options, barcode_sheet, archive_format)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+
+    return 0
+
+def render_purchase_order(selected_products, meta_data, use_asset_store=False, render_options=None, barcode_sheet=False, archive_format=None):
+    # Runs in a worker process. Returns the PO number, an error message (or
+    # None if the PO was rendered and copied successfully) and the run record
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+    start = time.perf_counter()
+    reset_record()
+
+    def result(error):
+        return po_number, error, snapshot_record(mode="batch", wall_seconds=round(time.perf_counter() - start, 6), error=error)
+
+    try:
+        return result(render_and_package(selected_products, meta_data, use_asset_store, render_options, barcode_sheet, archive_format))
+    except ValueError as e:
+        return result(str(e))
+
+def build_batch_jobs(data_set, purchase_orders):
+    # The (selected_products, meta_data) to render for every PO in a
+    # multi-PO workbook, and a (po_number, error) for every PO that can't be
+    products_by_sku = index_by_sku(data_set)
+    failures = []
+    jobs = []
+    po_number_counts = Counter(f"{meta_data.get('po_number', 'N/A')}" for meta_data, order in purchase_orders)
+
+    for meta_data, order in purchase_orders:
+        po_number = f"{meta_data.get('po_number', 'N/A')}"
+
+        # Every PO renders to {po_number}.pdf (and the watch tracks POs by
+        # number), and the order lines of all the POs with one number are
+        # lumped together, so none of them can be rendered
+        if po_number_counts[po_number] > 1:
+            failures.append((po_number, f"Duplicate PO number: {po_number_counts[po_number]} purchase orders in the workbook have it"))
+            continue
+
+        if not order:
+            failures.append((po_number, "No order lines"))
+            continue
+
+        try:
+            check_po_number(po_number)
+            selected_products = parse_order_lines(order, products_by_sku)
+            jobs.append((selected_products, apply_pricing(selected_products, products_by_sku, meta_data)))
+        except ValueError as e:
+            failures.append((po_number, str(e)))
+
+    return jobs, failures
+
+def run_batch(file_path, workers=None, use_asset_store=False, stats_path=None, render_options=None, barcode_sheet=False, archive_format=None):
+    # Parse the workbook once, then render every PO in a process pool
+    from concurrent.futures import ProcessPoolExecutor
+
+    try:
+        data_set, purchase_orders = read_workbook(file_path)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if not purchase_orders:
+        print(f"The workbook '{file_path}' has no purchase orders.", file=sys.stderr)
+        return 2
+
+    jobs, failures = build_batch_jobs(data_set, purchase_orders)
+    workers = workers or os.cpu_count() or 1
+    succeeded = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_purchase_order, selected_products, meta_data, use_asset_store, render_options, barcode_sheet, archive_format) for selected_products, meta_data in jobs]
+
+        for future, (selected_products, meta_data) in zip(futures, jobs):
+            try:
+                po_number, error, record = future.result()
+            except Exception as e:
+                po_number, error, record = f"{meta_data.get('po_number', 'N/A')}", f"Worker failed: {e}", None
+
+            # One record per PO, from the worker that rendered it
+            if stats_path and record:
+                write_record(stats_path, record)
+
+            if error:
+                failures.append((po_number, error))
+            else:
+                succeeded.append(po_number)
+
+    # Report the result of every PO
+    for po_number in succeeded:
+        print(f"OK      {po_number}")
+    for po_number, error in failures:
+        print(f"FAILED  {po_number}: {error}")
+    print(f"{len(succeeded)} of {len(purchase_orders)} purchase orders generated using {workers} worker(s).")
+
+    return 1 if failures else 0
+
+def run_binder(file_path, binder_file, po_numbers=None, render_options=None):
+    # Render the POs of a multi-PO workbook (all of them, or the given PO
+    # numbers in the given order) into one binder PDF for printing
+    from .binder import generate_binder
+
+    try:
+        data_set, purchase_orders = read_workbook(file_path)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    jobs, failures = build_batch_jobs(data_set, purchase_orders)
+
+    if po_numbers:
+        jobs_by_po_number = {f"{meta_data.get('po_number', 'N/A')}": (selected_products, meta_data) for selected_products, meta_data in jobs}
+        failed_po_numbers = {po_number for po_number, error in failures}
+        unknown = [po_number for po_number in po_numbers if po_number not in jobs_by_po_number and po_number not in failed_po_numbers]
+        if unknown:
+            print(f"Not in the workbook: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+
+        jobs = [jobs_by_po_number[po_number] for po_number in po_numbers if po_number in jobs_by_po_number]
+        failures = [(po_number, error) for po_number, error in failures if po_number in po_numbers]
+
+    for po_number, error in failures:
+        print(f"FAILED  {po_number}: {error}")
+
+    if not jobs:
+        print("No purchase orders to put in the binder.", file=sys.stderr)
+        return 2
+
+    try:
+        generate_binder(jobs, binder_file, render_options)
+    except Exception as e:
+        print(f"Failed to generate the binder: {e}", file=sys.stderr)
+        return 1
+
+    return 1 if failures else 0
+
+def run_interactive(file_path, use_asset_store=False, use_catalog_store=False, render_options=None, barcode_sheet=False, archive_format=None):
+    if file_path:
+        try:
+            if use_catalog_store:
+                data_set, meta_data = read_spreadsheet_from_store(file_path)
+            else:
+                data_set, meta_data = read_spreadsheet(file_path)
+            
+            selected_products = []
+
+            # Only the interactive mode needs curses, so import it here
+            import curses
+
+            # Initialize curses
+            while True:
+
+                selected_product = curses.wrapper(get_user_input, data_set)
+                selected_product_sku = selected_product["SKU"]
+                selected_product_title = selected_product["Title"]
+                selected_product_barcode = selected_product["Barcode"]
+                # Get quantity input from user
+                selected_product_quantity = input(f"Enter Quantity for SKU {selected_product_sku}: ")
+                
+                # Store the SKU, barcode, and quantity in a list
+                selected_products.append((selected_product_quantity, selected_product_sku, selected_product_title, selected_product_barcode))
+                
+                # Ask user if they want to add another SKU or finish
+                choice = input("Enter 1 to add another SKU or 2 to finish: ")
+                if choice == '2':
+                    break
+        
+            # Print all selected SKUs, quantities, and barcodes
+            print("Selected SKUs, Barcodes, and Quantities:")
+            for idx, (qty, sku, title, barcode) in enumerate(selected_products, start=1):
+                print(f"{idx}. SKU: {sku}, Barcode: {barcode}, Quantity: {qty}")
+            
+            # Line totals, subtotal and total from the catalog's unit prices, if it has them
+            meta_data = apply_pricing(selected_products, index_by_sku(data_set), meta_data)
+
+            # Generate PDF report and copy the assets
+            error = render_and_package(selected_products, meta_data, use_asset_store, render_options, barcode_sheet, archive_format)
+            if error:
+                print(error)
+                return 1
+
+        except ValueError as e:
+            print(e)
+            return 2
+    else:
+        print("No file selected, exiting.")
+        return 2
+
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a purchase order PDF from a SKU spreadsheet.")
+    parser.add_argument("spreadsheet", nargs="?", help="Path to the SKU spreadsheet. If omitted, a file dialog is shown.")
+    parser.add_argument("--order", help="JSON or CSV file of SKU/qty lines. Runs without any prompts.")
+    parser.add_argument("--batch", action="store_true", help="Treat the spreadsheet as a multi-PO workbook and render every PO in it.")
+    parser.add_argument("--asset-store", action="store_true", help="Keep one copy of each barcode/design file in cache/assets and hardlink or reflink it into the output folders.")
+    parser.add_argument("--catalog-store", action="store_true", help="Import the SKU sheet into cache/catalog.sqlite3 and read it from there. Only re-imports when the workbook changes.")
+    parser.add_argument("--serve", metavar="ADDRESS", help="Run as a local render service on a TCP port ('8765' or 'host:8765') or a Unix socket path. See README.txt for the requests it accepts.")
+    parser.add_argument("--watch", action="store_true", help="Render every PO in a multi-PO workbook (like --batch), then keep watching the workbook and the assets folder and re-render the POs a change affects.")
+    parser.add_argument("--binder", metavar="FILE", help="Render the POs of a multi-PO workbook into one PDF for printing, with a bookmark for each PO, and write a manifest of their page ranges next to it (FILE with a .json extension).")
+    parser.add_argument("--only", metavar="PO_NUMBERS", help="Comma-separated PO numbers to put in the binder, in that order (default: every PO in the workbook).")
+    parser.add_argument("--workers", type=int, help="Number of worker processes for --batch, --watch and --serve (default: one per CPU core).")
+    parser.add_argument("--image-dpi", type=int, default=THUMBNAIL_DPI, help=f"Resolution every embedded image is resampled to, at its printed size (default: {THUMBNAIL_DPI}; use 300 for print quality).")
+    parser.add_argument("--jpeg-quality", type=int, default=THUMBNAIL_JPEG_QUALITY, choices=range(1, 96), metavar="1-95", help=f"JPEG quality of the resampled images (default: {THUMBNAIL_JPEG_QUALITY}).")
+    parser.add_argument("--vector-barcodes", action="store_true", help="Draw scannable vector barcodes (EAN-13, UPC-A or Code 128, picked from the value) in the Barcode column.")
+    parser.add_argument("--barcode-sheet", action="store_true", help="Put a {po_number}_barcodes.pdf sheet of vector barcodes in the output folder instead of copying the {barcode}.png files.")
+    parser.add_argument("--archive", choices=ARCHIVE_FORMATS, help="Write everything for the PO into one outputs/{po_number}.zip or .tar.zst archive instead of a folder. tar.zst needs the zstandard package.")
+    parser.add_argument("--attach-designs", action="store_true", help="Embed the {sku}_DESIGN.png files in the PDF as attachments instead of copying them next to it.")
+    parser.add_argument("--max-pages", type=int, metavar="N", help="Split long POs into numbered volumes ({po_number}.pdf, {po_number}_vol2.pdf, ...) of at most N pages. Only one volume is held in memory at a time.")
+    parser.add_argument("--max-volume-mb", type=float, metavar="MB", help="Split long POs into numbered volumes of roughly at most MB megabytes each.")
+    parser.add_argument("--shards", type=int, metavar="N", help="Draw the pages of a long PO in N worker processes and put them together into one PDF, the same as a serial render. Each shard gets at least 500 line items; ignored with --max-pages or --max-volume-mb.")
+    parser.add_argument("--reproducible", action="store_true", help="Render byte-for-byte identical PDFs for the same PO and assets: no timestamps (the PDF is dated with the PO date) and images embedded under names taken from their content.")
+    parser.add_argument("--stats", metavar="FILE", help="Append a JSON record with per-stage timings, counts and bytes for each run to FILE ('-' for stderr).")
+    parser.add_argument("--profile", metavar="FILE", help="Write cProfile statistics for the run to FILE (view with python -m pstats FILE). In --batch mode only the parent process is profiled.")
+    return parser.parse_args(argv)
+
+def get_render_options(args):
+    # Keyword arguments for generate_pdf
+    return {
+        "image_dpi": args.image_dpi,
+        "jpeg_quality": args.jpeg_quality,
+        "vector_barcodes": args.vector_barcodes,
+        "attach_designs": args.attach_designs,
+        "max_pages": args.max_pages,
+        "max_volume_bytes": int(args.max_volume_mb * 1024 * 1024) if args.max_volume_mb else None,
+        "reproducible": args.reproducible,
+        "shards": args.shards,
+    }
+
+def run(args):
+    render_options = get_render_options(args)
+
+    # Service mode: keep the catalog and warm render processes around for many POs
+    if args.serve:
+        if not args.spreadsheet:
+            print("--serve requires a spreadsheet path.", file=sys.stderr)
+            return 2
+
+        # Only the service needs http.server, so import it here
+        from .service import serve
+        return serve(args.spreadsheet, args.serve, args.workers, render_options, args.asset_store, args.barcode_sheet, args.archive, args.stats)
+
+    # Watch mode: batch mode, then again for every change to the workbook or the assets
+    if args.watch:
+        if not args.spreadsheet:
+            print("--watch requires a spreadsheet path.", file=sys.stderr)
+            return 2
+
+        from .watch import watch
+        return watch(args.spreadsheet, args.workers, render_options, args.asset_store, args.barcode_sheet, args.archive, args.stats)
+
+    # Binder mode: many POs in one PDF, for printing
+    if args.binder:
+        if not args.spreadsheet:
+            print("--binder requires a spreadsheet path.", file=sys.stderr)
+            return 2
+        po_numbers = [po_number.strip() for po_number in args.only.split(",") if po_number.strip()] if args.only else None
+        return run_binder(args.spreadsheet, args.binder, po_numbers, render_options)
+
+    # Batch mode: every PO in a multi-PO workbook, rendered in parallel
+    if args.batch:
+        if not args.spreadsheet:
+            print("--batch requires a spreadsheet path.", file=sys.stderr)
+            return 2
+        return run_batch(args.spreadsheet, args.workers, args.asset_store, args.stats, render_options, args.barcode_sheet, args.archive)
+
+    # Headless mode: everything comes from the command line
+    if args.order:
+        if not args.spreadsheet:
+            print("--order requires a spreadsheet path.", file=sys.stderr)
+            return 2
+        return run_headless(args.spreadsheet, args.order, args.asset_store, args.catalog_store, render_options, args.barcode_sheet, args.archive)
+
+    file_path = args.spreadsheet or open_file_dialog()
+    return run_interactive(file_path, args.asset_store, args.catalog_store, render_options, args.barcode_sheet, args.archive)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    reset_record()
+    start = time.perf_counter()
+
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        exit_code = run(args)
+    finally:
+        if args.profile:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+
+    # Batch, watch and service mode write one record per PO from the workers instead
+    if args.stats and not (args.batch or args.watch or args.serve):
+        mode = "binder" if args.binder else "headless" if args.order else "interactive"
+        write_record(args.stats, snapshot_record(mode=mode, wall_seconds=round(time.perf_counter() - start, 6), exit_code=exit_code))
+
+    return exit_code
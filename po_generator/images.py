@@ -0,0 +1,125 @@
+import hashlib
+import os
+
+from .instrumentation import timed, add_count
+
+# Downscaled copies of the images embedded in the PDF (SKU photos and the
+# logo), resampled to the size they are printed at
+THUMBNAIL_CACHE_FOLDER = os.path.join("cache", "thumbnails")
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Default output quality: 150 DPI is plenty for a PO; use 300 for print work
+THUMBNAIL_DPI = 150
+THUMBNAIL_JPEG_QUALITY = 85
+
+def get_image_size(image_path):
+    # Pixel size from the image header, without decoding the image
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        return img.size
+
+def get_thumbnail(image_path, box_width, box_height, dpi=THUMBNAIL_DPI, quality=THUMBNAIL_JPEG_QUALITY, cache_folder=THUMBNAIL_CACHE_FOLDER):
+    # Return (thumbnail_path, width, height) for an image scaled to fit a
+    # box_width x box_height point cell at the given DPI. Images that are
+    # already small enough are returned as they are. Raises IOError if the
+    # source image is missing or unreadable, like Image.open does
+    from PIL import Image
+
+    stat = os.stat(image_path)
+
+    # Key on the path, modification time and target size, so an edited
+    # image or a different cell size gets a fresh thumbnail
+    key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{box_width}x{box_height}@{dpi}|q{quality}"
+    thumbnail_path = os.path.join(cache_folder, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+    try:
+        with Image.open(thumbnail_path) as thumbnail:
+            width, height = thumbnail.size
+
+        # Touch the file so eviction drops the least recently used thumbnails first
+        os.utime(thumbnail_path)
+        add_count("thumbnail_cache_hits")
+        return thumbnail_path, width, height
+    except IOError:
+        pass
+
+    add_count("thumbnail_cache_misses")
+
+    target_size = (max(1, round(box_width / 72 * dpi)), max(1, round(box_height / 72 * dpi)))
+
+    with timed("image_load"), Image.open(image_path) as img:
+        # Re-encoding a JPEG that is already at (or below) the print
+        # resolution would only lose quality
+        if img.format == "JPEG" and img.width <= target_size[0] and img.height <= target_size[1]:
+            return image_path, img.width, img.height
+
+        # Let the JPEG decoder skip straight to a reduced scale
+        img.draft("RGB", target_size)
+        img = img.convert("RGB")
+        img.thumbnail(target_size, Image.LANCZOS)
+
+        # Write to a temporary name first so parallel runs never see a partial file
+        os.makedirs(cache_folder, exist_ok=True)
+        temporary_path = f"{thumbnail_path}.{os.getpid()}.tmp"
+        img.save(temporary_path, "JPEG", quality=quality, optimize=True)
+        os.replace(temporary_path, thumbnail_path)
+
+        return thumbnail_path, img.width, img.height
+
+def content_copy(image_path, cache_folder=THUMBNAIL_CACHE_FOLDER):
+    # A copy of the image named after its bytes. reportlab names every
+    # embedded image after its file name, and thumbnail names depend on where
+    # the source is and when it was last modified, so reproducible PDFs embed
+    # these copies instead
+    import threading
+
+    with open(image_path, "rb") as f:
+        data = f.read()
+
+    extension = os.path.splitext(image_path)[1].lower()
+    copy_path = os.path.join(cache_folder, "content-" + hashlib.sha256(data).hexdigest()[:32] + extension)
+
+    try:
+        # Touch the file so eviction keeps it as long as the thumbnail
+        os.utime(copy_path)
+        return copy_path
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(cache_folder, exist_ok=True)
+    temporary_path = f"{copy_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(data)
+    os.replace(temporary_path, copy_path)
+    return copy_path
+
+def evict_thumbnail_cache(cache_folder=THUMBNAIL_CACHE_FOLDER, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+    evict_cache(cache_folder, max_bytes)
+
+def evict_cache(cache_folder, max_bytes):
+    # Delete the least recently used files (by modification time, which a
+    # cache hit touches) until the cache folder fits in max_bytes
+    try:
+        entries = [entry for entry in os.scandir(cache_folder) if entry.is_file()]
+    except FileNotFoundError:
+        return
+
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_bytes = sum(size for _, size, _ in files)
+
+    for _, size, path in sorted(files):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import threading
+import json
+import time
+import sys
+
+# Timings and counters for the current run. Updated from the render thread
+# and the image prefetch threads, so every change goes through the lock
+record_lock = threading.Lock()
+run_record = {"fields": {}, "stages": {}, "counters": {}}
+
+def reset_record():
+    with record_lock:
+        run_record["fields"] = {}
+        run_record["stages"] = {}
+        run_record["counters"] = {}
+
+def set_field(name, value):
+    # Extra information for the record, e.g. the PO number
+    with record_lock:
+        run_record["fields"][name] = value
+
+@contextmanager
+def timed(stage):
+    # Add the time spent in the block to the stage. Works as a context
+    # manager or as a function decorator. Nested stages are all counted,
+    # so "generate_pdf" includes "pdf_save"
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        with record_lock:
+            stage_record = run_record["stages"].setdefault(stage, {"seconds": 0.0, "count": 0})
+            stage_record["seconds"] += duration
+            stage_record["count"] += 1
+
+def add_count(counter, amount=1):
+    with record_lock:
+        run_record["counters"][counter] = run_record["counters"].get(counter, 0) + amount
+
+def snapshot_record(**fields):
+    # A copy of the current record plus any extra fields, ready for JSON
+    with record_lock:
+        stages = {stage: dict(values, seconds=round(values["seconds"], 6)) for stage, values in run_record["stages"].items()}
+        record = {"timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+        record.update(run_record["fields"])
+        record.update(fields)
+        record["stages"] = stages
+        record["counters"] = dict(run_record["counters"])
+    return record
+
+def write_record(path, record):
+    # Append the record as one JSON line; "-" writes it to stderr
+    line = json.dumps(record, default=str)
+
+    if path == "-":
+        print(line, file=sys.stderr)
+    else:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -0,0 +1,115 @@
+from functools import lru_cache
+import hashlib
+import os
+
+from .images import get_image_size, get_thumbnail
+from .text_layout import get_string_height, string_width
+from .instrumentation import add_count
+
+LOGO_PATH = os.path.join("assets", "logo.jpg")
+
+# Meta data fields printed in the letterhead
+COMPANY_FIELDS = ["company_name", "company_address_1", "company_address_2", "company_country"]
+
+# Text sizes of the company name, the title and the address lines
+COMPANY_NAME_SIZE = 14
+TITLE_SIZE = 18
+TEXT_SIZE = 10
+
+def logo_state(logo_path):
+    # Where the logo is and its modification time and size, or None if there
+    # is no logo: an edited logo must not reuse an old layout
+    try:
+        stat = os.stat(logo_path)
+    except FileNotFoundError:
+        return None
+    return (os.path.abspath(logo_path), stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=64)
+def letterhead_layout(company, logo, page_size, margins, image_dpi, jpeg_quality):
+    # Everything in the letterhead, laid out: the logo centred at the top,
+    # the company name and address on the left and "PURCHASE ORDER" on the
+    # right. Kept per company, logo file and layout, so a batch or service
+    # worker lays it out (and looks up the logo thumbnail) once for all the
+    # POs it renders. Returns a dict with the logo as (thumbnail_path, x, y,
+    # width, height) or None, the strings as (font, size, x, y, text) and the
+    # baseline of the title
+    page_width, page_height = page_size
+    margin_width, margin_height = margins
+    company_name, company_address_1, company_address_2, company_country = company
+
+    # Load and position company logo if available
+    logo_image = None
+    try:
+        #Resize the image
+        logo_width, logo_height = get_image_size(LOGO_PATH)
+        logo_width = logo_width / 9
+        logo_height = logo_height / 9
+
+        thumbnail, _, _ = get_thumbnail(LOGO_PATH, logo_width, logo_height, image_dpi, jpeg_quality)
+
+        #Center the image on the page
+        x = (page_width - logo_width) / 2
+        y = (page_height - logo_height)
+        logo_image = (thumbnail, x, y, logo_width, logo_height)
+    except Exception as e:
+        print(f"Failed to load company logo: {e}")
+
+    # The company name, with the address lines under it
+    company_name_y = page_height - margin_height - get_string_height(company_name, "Helvetica-Bold", COMPANY_NAME_SIZE)
+    strings = [("Helvetica-Bold", COMPANY_NAME_SIZE, margin_width, company_name_y, company_name)]
+    for line_number, line in enumerate([company_address_1, company_address_2, company_country], start=1):
+        strings.append(("Helvetica", TEXT_SIZE, margin_width, company_name_y - 15 * line_number, line))
+
+    # The title, aligned to the right
+    title_text = "PURCHASE ORDER"
+    title_x = page_width - margin_width - string_width(title_text, "Helvetica-Bold", TITLE_SIZE)
+    title_y = page_height - margin_height - get_string_height(title_text, "Helvetica-Bold", TITLE_SIZE)
+    strings.append(("Helvetica-Bold", TITLE_SIZE, title_x, title_y, title_text))
+
+    return {
+        "logo": logo_image,
+        "strings": tuple(strings),
+        "title_y": title_y,
+    }
+
+def get_letterhead(meta_data, page_size, margins, image_dpi, jpeg_quality):
+    # The letterhead layout for this PO's company
+    company = tuple(f"{meta_data.get(field, 'N/A')}" for field in COMPANY_FIELDS)
+    layout = letterhead_layout(company, logo_state(LOGO_PATH), page_size, margins, image_dpi, jpeg_quality)
+
+    # Thumbnail cache eviction may have removed the logo thumbnail since
+    if layout["logo"] and not os.path.exists(layout["logo"][0]):
+        letterhead_layout.cache_clear()
+        layout = letterhead_layout(company, logo_state(LOGO_PATH), page_size, margins, image_dpi, jpeg_quality)
+    return layout
+
+def draw_letterhead_contents(c, layout):
+    if layout["logo"]:
+        thumbnail, x, y, width, height = layout["logo"]
+        c.drawImage(thumbnail, x, y, width=width, height=height)
+    for font_name, font_size, x, y, text in layout["strings"]:
+        c.setFont(font_name, font_size)
+        c.drawString(x, y, text)
+
+def draw_letterhead(c, layout, as_form=False):
+    # Draw the letterhead. It is only on a PO's first page, so it is drawn
+    # straight onto the page unless as_form: then it is stored once per
+    # document as a form and referenced wherever it appears again, so a
+    # binder of many POs holds one form per company. The form is named after
+    # what it draws; reproducible renders pass a layout whose logo is a
+    # content-addressed copy
+    if not as_form:
+        draw_letterhead_contents(c, layout)
+        return
+
+    key = repr((layout["logo"], layout["strings"]))
+    form_name = "letterhead_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    if not c.hasForm(form_name):
+        c.beginForm(form_name)
+        draw_letterhead_contents(c, layout)
+        c.endForm()
+        add_count("letterhead_forms")
+
+    c.doForm(form_name)
@@ -0,0 +1,256 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import shutil
+import hashlib
+import os
+
+from .barcodes import generate_barcode_sheet
+from .pdf import check_po_number, volume_files
+from .instrumentation import timed, add_count
+
+# Content-addressed store: every unique asset is kept once, named by its hash
+ASSET_STORE_FOLDER = os.path.join("cache", "assets")
+
+# Threads copying assets into a PO folder. The copies mostly wait on I/O,
+# so this pays off on network shares even with few cores
+COPY_WORKERS = 8
+
+# Hashes of the assets already seen by this process, keyed by path, mtime and size
+asset_hash_cache = {}
+
+def hash_asset(file_path):
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+    if key not in asset_hash_cache:
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        asset_hash_cache[key] = sha256.hexdigest()
+
+    return asset_hash_cache[key], stat.st_size
+
+def store_asset(source_file, store_folder=ASSET_STORE_FOLDER):
+    # Add the asset to the store (if it isn't there yet) and return its path there
+    digest, size = hash_asset(source_file)
+    extension = os.path.splitext(source_file)[1]
+    stored_file = os.path.join(store_folder, digest[:2], digest + extension)
+
+    if not os.path.exists(stored_file):
+        os.makedirs(os.path.dirname(stored_file), exist_ok=True)
+
+        # Copy to a temporary name first so parallel runs (and copy threads)
+        # never see a partial file
+        temporary_file = f"{stored_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copy2(source_file, temporary_file)
+        os.replace(temporary_file, stored_file)
+
+    return stored_file, size
+
+def reflink(source_file, destination_file):
+    # Copy-on-write clone (Linux btrfs/XFS). Raises OSError where unsupported
+    try:
+        import fcntl
+    except ImportError as e:
+        raise OSError("Reflinks are not supported on this platform") from e
+
+    FICLONE = 0x40049409
+    with open(source_file, "rb") as src, open(destination_file, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination_file)
+            raise
+
+def link_asset(source_file, destination_file, store_folder=ASSET_STORE_FOLDER):
+    # Place a stored copy of the asset at destination_file without copying
+    # its bytes where possible: reflink, then hardlink, then a plain copy.
+    # Returns the method used and the file size
+    stored_file, size = store_asset(source_file, store_folder)
+
+    # Link under a temporary name so an existing output file is replaced atomically
+    temporary_file = f"{destination_file}.{os.getpid()}.tmp"
+
+    try:
+        reflink(stored_file, temporary_file)
+        method = "reflink"
+    except OSError:
+        try:
+            os.link(stored_file, temporary_file)
+            method = "hardlink"
+        except OSError:
+            shutil.copy2(stored_file, temporary_file)
+            method = "copy"
+
+    os.replace(temporary_file, destination_file)
+    return method, size
+
+def required_assets(selected_products, barcode_sheet=False, include_designs=True):
+    # Names of the files in the assets folder that the output needs, each once
+    names = []
+    for qty, sku, title, barcode in selected_products:
+        if not barcode_sheet:
+            names.append(f"{barcode}.png")
+        if include_designs:
+            names.append(f"{sku}_DESIGN.png")
+    return list(dict.fromkeys(names))
+
+def find_missing_assets(selected_products, barcode_sheet=False, source_folder="assets"):
+    # Check every asset with one scan of the assets folder, before anything is
+    # rendered or copied. The designs are always needed: they are either
+    # copied or attached to the PDF
+    try:
+        available = {os.path.normcase(name) for name in os.listdir(source_folder)}
+    except FileNotFoundError:
+        raise ValueError(f"Source folder '{source_folder}' does not exist.")
+
+    return [name for name in required_assets(selected_products, barcode_sheet) if os.path.normcase(name) not in available]
+
+def is_unchanged(source_file, previous_file):
+    # copy2 and the asset store keep the modification time, so an earlier
+    # copy with the same size and time is the same file
+    try:
+        source = os.stat(source_file)
+        previous = os.stat(previous_file)
+    except FileNotFoundError:
+        return False
+    return source.st_size == previous.st_size and source.st_mtime_ns == previous.st_mtime_ns
+
+def publish_folder(staging_folder, final_folder):
+    # Swap the staged folder into place. A rename is atomic, but it can't
+    # replace a folder that isn't empty, so an earlier output for the same
+    # PO is moved aside first. The earlier output is deleted, so the final
+    # folder must sit right next to the staging folder (in outputs/), never
+    # anywhere else a PO number could point
+    parent_folder = os.path.realpath(os.path.dirname(staging_folder))
+    if os.path.dirname(os.path.realpath(final_folder)) != parent_folder or os.path.basename(os.path.normpath(final_folder)) in ("", ".", ".."):
+        raise ValueError(f"Refusing to publish to '{final_folder}': it is not a folder in '{parent_folder}'.")
+
+    old_folder = None
+    if os.path.exists(final_folder):
+        old_folder = f"{staging_folder}.old"
+
+        # Left behind by a run that crashed between the renames
+        if os.path.exists(old_folder):
+            shutil.rmtree(old_folder)
+        os.rename(final_folder, old_folder)
+
+    os.rename(staging_folder, final_folder)
+
+    if old_folder:
+        shutil.rmtree(old_folder)
+
+@timed("create_output_folder")
+def create_output_folder(selected_products, meta_data, use_asset_store=False, barcode_sheet=False, include_designs=True, render=None):
+    # Copy the assets and the PDF into outputs/{po_number}. Everything is
+    # staged in a temporary folder that only replaces outputs/{po_number}
+    # once complete. If render is given it is called (to generate the PDF)
+    # while the assets copy; its exceptions are passed on to the caller.
+    # Returns the folder path, or None on error
+
+    source_folder = "assets"
+    destination_folder = "outputs"
+
+    po_number = check_po_number(f"{meta_data.get('po_number', 'N/A')}")
+
+    new_folder_path = os.path.join(destination_folder, po_number)
+    staging_folder = os.path.join(destination_folder, f".{po_number}.{os.getpid()}.tmp")
+    rendered = render is None
+
+    try:
+        # Check if the source folder exists
+        if not os.path.exists(source_folder):
+            print(f"Source folder '{source_folder}' does not exist.")
+            return None
+
+        # Left behind by a run that crashed (a reused process ID finds it)
+        shutil.rmtree(staging_folder, ignore_errors=True)
+        os.makedirs(staging_folder)
+
+        @timed("copy_asset")
+        def copy_asset(name):
+            # Returns the size and whether it was linked instead of copied
+            source_file = os.path.join(source_folder, name)
+            destination_file = os.path.join(staging_folder, name)
+            previous_file = os.path.join(new_folder_path, name)
+
+            # Unchanged since the last run for this PO: link the previous
+            # output's file instead of copying it again
+            if is_unchanged(source_file, previous_file):
+                try:
+                    os.link(previous_file, destination_file)
+                    size = os.path.getsize(destination_file)
+                    add_count("assets_unchanged")
+                    add_count("asset_bytes", size)
+                    return size, True
+                except OSError:
+                    pass
+
+            if use_asset_store:
+                method, size = link_asset(source_file, destination_file)
+                linked = method != "copy"
+                if linked:
+                    add_count("asset_bytes_linked", size)
+            else:
+                shutil.copy2(source_file, destination_file)  # Copy the file
+                size = os.path.getsize(destination_file)
+                linked = False
+
+            add_count("assets_copied")
+            add_count("asset_bytes", size)
+            return size, linked
+
+        # Don't need to copy the SKU images to the output folder, just the
+        # barcodes (unless the barcode sheet replaces them) and the designs
+        # (unless they are attached to the PDF). Repeated SKUs are copied once
+        with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+            copies = [executor.submit(copy_asset, name) for name in required_assets(selected_products, barcode_sheet, include_designs)]
+
+            if render:
+                try:
+                    render()
+                except Exception:
+                    for copy in copies:
+                        copy.cancel()
+                    raise
+                rendered = True
+
+            sizes = [copy.result() for copy in copies]
+
+        total_bytes = sum(size for size, linked in sizes)
+        saved_bytes = sum(size for size, linked in sizes if linked)
+
+        # Vector barcodes for every SKU, in one small PDF
+        if barcode_sheet:
+            sheet_file = generate_barcode_sheet(selected_products, os.path.join(staging_folder, f"{po_number}_barcodes.pdf"))
+            add_count("barcode_sheet_bytes", os.path.getsize(sheet_file))
+
+        # Move the new PDF we generated (every volume, if it was split)
+        for pdf_file in volume_files(po_number):
+            destination_file = os.path.join(staging_folder, pdf_file)
+            shutil.move(pdf_file, destination_file)  # Move the file
+
+        publish_folder(staging_folder, new_folder_path)
+
+        print(f"Files copied from '{source_folder}' to '{new_folder_path}' successfully.")
+        if use_asset_store:
+            print(f"Asset store: {saved_bytes} of {total_bytes} bytes linked instead of copied.")
+        return new_folder_path
+    
+    except Exception as e:
+        shutil.rmtree(staging_folder, ignore_errors=True)
+
+        # Rendering errors are reported by the caller
+        if not rendered:
+            raise
+
+        # The PDF rendered here would otherwise be left in the working folder
+        if render:
+            for pdf_file in volume_files(po_number):
+                if os.path.exists(pdf_file):
+                    os.remove(pdf_file)
+
+        print(f"An error occurred: {str(e)}")
+        return None
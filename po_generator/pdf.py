@@ -0,0 +1,694 @@
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+import math
+import zlib
+import os
+
+from .images import THUMBNAIL_DPI, THUMBNAIL_JPEG_QUALITY, get_thumbnail, content_copy, evict_thumbnail_cache
+from .barcodes import draw_barcode
+from .letterhead import get_letterhead, draw_letterhead
+from .text_layout import get_string_height, string_width, wrap_text
+from .instrumentation import timed, add_count, set_field
+
+# Part of the render cache key. Bump it whenever a change to generate_pdf
+# changes what it draws, so PDFs cached by older versions are not reused
+LAYOUT_VERSION = 5
+
+# Longest descriptions: titles beyond this many lines are cut short with "..."
+MAX_TITLE_LINES = 4
+MAX_ATTACHMENT_LINES = 2
+
+# Estimated size of a page object in a split PO, for max_volume_bytes
+PAGE_OBJECT_BYTES = 1024
+
+def plan_pages(row_heights, total_count, first_table_top, continuation_top, bottom_limit, header_height, total_row_height):
+    # Lay out the line items (each as tall as its description needs) and the
+    # totals block in a single pass, before anything is drawn. Every page is
+    # a dict with:
+    #   table_top    top of the table header on this page (None if the page only has totals)
+    #   rows_top     top of the first line item row (just under the header)
+    #   first_row    index of the first line item on this page
+    #   row_count    number of line items on this page
+    #   totals_top   top of the totals block on this page
+    #   first_total  index of the first totals item on this page
+    #   total_count  number of totals items on this page
+    def new_page(table_top, first_row, first_total):
+        rows_top = table_top - header_height if table_top is not None else continuation_top
+        return {
+            "table_top": table_top,
+            "rows_top": rows_top,
+            "first_row": first_row,
+            "row_count": 0,
+            "totals_top": rows_top,
+            "first_total": first_total,
+            "total_count": 0,
+        }
+
+    pages = [new_page(first_table_top, 0, 0)]
+    y_pos = pages[-1]["rows_top"]
+
+    # Line items, repeating the table header on every new page
+    row_count = len(row_heights)
+    for row, row_height in enumerate(row_heights):
+        if y_pos - row_height < bottom_limit:
+            pages.append(new_page(continuation_top, row, 0))
+            y_pos = pages[-1]["rows_top"]
+
+        pages[-1]["row_count"] += 1
+        y_pos -= row_height
+
+    # The totals block continues straight under the last row
+    pages[-1]["totals_top"] = y_pos
+
+    for item in range(total_count):
+        if y_pos - total_row_height < bottom_limit:
+            pages.append(new_page(None, row_count, item))
+            y_pos = pages[-1]["totals_top"]
+
+        pages[-1]["total_count"] += 1
+        y_pos -= total_row_height
+
+    return pages
+
+def shard_range(page_count, index, count):
+    # First and last page (counting from 1) of the index-th of count
+    # page-aligned chunks of a PO. Empty (last < first) if there are more
+    # chunks than pages
+    return page_count * index // count + 1, page_count * (index + 1) // count
+
+def attach_files(c, file_paths):
+    # Embed the files in the PDF as attachments, listed in the viewer's
+    # attachments panel, so the PDF carries them along wherever it goes
+    from reportlab.pdfbase.pdfdoc import PDFDictionary, PDFArray, PDFStream, PDFString, PDFName
+
+    document = c._doc
+    names = []
+
+    # The EmbeddedFiles name tree has to be sorted by name
+    for file_path in sorted(dict.fromkeys(file_paths), key=os.path.basename):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        name = os.path.basename(file_path)
+
+        # PNG and JPEG data is already compressed, so it is stored as it is
+        stream = PDFStream(PDFDictionary({"Type": PDFName("EmbeddedFile"), "Params": PDFDictionary({"Size": len(data)})}), data, filters=[])
+        file_spec = PDFDictionary({"Type": PDFName("Filespec"), "F": PDFString(name), "UF": PDFString(name), "EF": PDFDictionary({"F": document.Reference(stream)})})
+        names += [PDFString(name), document.Reference(file_spec)]
+
+        add_count("attachments")
+        add_count("attachment_bytes", len(data))
+
+    document.Catalog.Names = PDFDictionary({"EmbeddedFiles": PDFDictionary({"Names": PDFArray(names)})})
+    document.Catalog.setPageMode("UseAttachments")
+
+def check_po_number(po_number):
+    # The PO number names the PDF and the output folder, so it must not be a
+    # path that leads anywhere else. Raises ValueError
+    if not po_number or os.path.isabs(po_number) or os.path.splitdrive(po_number)[0] or "/" in po_number or "\\" in po_number or ".." in po_number:
+        raise ValueError(f"Invalid PO number '{po_number}': it can't be empty, a path, or contain '..'.")
+    return po_number
+
+def volume_file(po_number, volume):
+    # Volume 1 is {po_number}.pdf, so unsplit POs keep their usual name
+    return f"{po_number}.pdf" if volume == 1 else f"{po_number}_vol{volume}.pdf"
+
+def volume_files(po_number):
+    # The PDF files of a rendered PO: {po_number}.pdf, then
+    # {po_number}_vol2.pdf, {po_number}_vol3.pdf, ... if it was split
+    files = [volume_file(po_number, 1)]
+    while os.path.exists(volume_file(po_number, len(files) + 1)):
+        files.append(volume_file(po_number, len(files) + 1))
+    return files
+
+def remove_volumes(po_number, first_volume=2):
+    # Remove volumes left over from an earlier render, so volume_files
+    # doesn't pick them up
+    volume = first_volume
+    while os.path.exists(volume_file(po_number, volume)):
+        os.remove(volume_file(po_number, volume))
+        volume += 1
+
+def parse_po_date(po_date_ts):
+    # The PO date as a datetime, or None if the meta data has none
+    if po_date_ts == 'N/A':
+        return None
+
+    if not isinstance(po_date_ts, str):
+        # Convert Timestamp to string
+        po_date_str = po_date_ts.strftime('%Y-%m-%dT%H:%M:%SZ')
+    else:
+        po_date_str = po_date_ts
+
+    # Parse the date string to a datetime object
+    return datetime.strptime(po_date_str, '%Y-%m-%dT%H:%M:%SZ')
+
+def create_canvas(file_path, meta_data, reproducible=False):
+    # A canvas for a PO's PDF, with its document properties. With
+    # reproducible, the same PO renders to the same bytes every time:
+    # reportlab's invariant mode drops the timestamps (and the document ID
+    # made from them), and the creation date is the PO date
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+    po_date_dt = parse_po_date(meta_data.get('po_date', 'N/A'))
+
+    c = canvas.Canvas(file_path, pagesize=letter, pageCompression=1, invariant=1 if reproducible else None)
+    c.setTitle(f"Purchase Order {po_number}")
+    c.setAuthor(f"{meta_data.get('company_name', 'N/A')}")
+    c.setSubject("Purchase order")
+    c.setCreator("PO Generator")
+    if reproducible and po_date_dt:
+        c.setDateFormatter(lambda *now: po_date_dt.strftime("D:%Y%m%d%H%M%S+00'00'"))
+    return c
+
+@timed("generate_pdf")
+def generate_pdf(selected_products, meta_data, image_dpi=THUMBNAIL_DPI, jpeg_quality=THUMBNAIL_JPEG_QUALITY, vector_barcodes=False, attach_designs=False, max_pages=None, max_volume_bytes=None, reproducible=False, shards=None, into=None, shard=None, letterhead_form=False):
+    check_po_number(f"{meta_data.get('po_number', 'N/A')}")
+
+    # Long POs can have their pages drawn in several processes at once
+    # (volumes are written one after another, so they are always drawn here)
+    if shards and shards > 1 and into is None and not (max_pages or max_volume_bytes):
+        from .sharding import generate_pdf_sharded
+        return generate_pdf_sharded(selected_products, meta_data, shards, image_dpi=image_dpi, jpeg_quality=jpeg_quality, vector_barcodes=vector_barcodes, attach_designs=attach_designs, reproducible=reproducible)
+
+    # reportlab is only needed for rendering, so import it here
+    from reportlab.lib.pagesizes import letter
+    from reportlab import rl_config
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+    from reportlab.platypus import Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    # Create a PDF document. reportlab keeps every page in memory until the
+    # file is saved, so with max_pages or max_volume_bytes a long PO is
+    # written as numbered volumes instead, each saved (and freed) before the
+    # next one starts. With into (a binder's canvas, or a shard worker's)
+    # the PO is drawn from the canvas's current page on and nothing is
+    # saved; with shard=(index, count) only that chunk of its pages is drawn
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+    po_date_dt = parse_po_date(meta_data.get('po_date', 'N/A'))
+    pdf_file = volume_file(po_number, 1)
+    set_field("po_number", po_number)
+
+    if into is not None:
+        c = into
+    else:
+        remove_volumes(po_number)
+        c = create_canvas(pdf_file, meta_data, reproducible)
+
+    # Define margins
+    margin_width = 0.5 * 72  # 0.75 inches converted to points (72 points per inch)
+    margin_height = 0.5 * 72
+
+    # Define text sizes (the letterhead's are in letterhead.py)
+    Text_size = 10
+
+    # Define line spacing
+    line_spacing = 2
+
+    def add_new_page():
+        c.showPage()
+        c.setFont("Helvetica", Text_size)
+
+    #Center the image on the page
+    page_width, page_height = letter
+
+    # Get the available width and height inside the margins
+    available_width = page_width - 2 * margin_width
+    available_height = page_height -2 * margin_height
+
+    # Every embedded image is resampled to the size it is printed at. Keep
+    # track of the bytes before and after for the run summary
+    image_bytes = {}
+
+    # Rough size of the volume being drawn: the images embedded in it so far
+    # plus the compressed content of its finished pages. reportlab writes
+    # streams ASCII85 encoded by default, 5 bytes for every 4
+    volume = {"number": 1, "pages": 0, "bytes": 0, "images": set()}
+    stream_scale = 1.25 if rl_config.useA85 else 1
+
+    def use_image(image_path):
+        if image_path not in volume["images"]:
+            volume["images"].add(image_path)
+            volume["bytes"] += os.path.getsize(image_path) * stream_scale
+
+    def save_volume():
+        # The design files go with the first volume, after its last page
+        if attach_designs and volume["number"] == 1:
+            c.showPage()
+            attach_files(c, [os.path.join("assets", f"{sku}_DESIGN.png") for qty, sku, title, barcode in selected_products])
+
+        with timed("pdf_save"):
+            c.save()
+        add_count("pdf_bytes", os.path.getsize(volume_file(po_number, volume["number"])))
+
+    # The letterhead (logo, company name and address, title), laid out once
+    # per company. With letterhead_form (a binder, where POs of the same
+    # company share it) it is drawn as a form
+    letterhead = get_letterhead(meta_data, letter, (margin_width, margin_height), image_dpi, jpeg_quality)
+    if reproducible and letterhead["logo"]:
+        letterhead = dict(letterhead, logo=(content_copy(letterhead["logo"][0]),) + letterhead["logo"][1:])
+    draw_letterhead(c, letterhead, letterhead_form)
+    if letterhead["logo"]:
+        image_bytes[os.path.join("assets", "logo.jpg")] = letterhead["logo"][0]
+        use_image(letterhead["logo"][0])
+    title_y = letterhead["title_y"]
+
+    # Set the font and size for the smaller text
+    c.setFont("Helvetica", Text_size)
+    
+    # Get the PO details from meta_data
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+
+    if po_date_dt:
+        # Format the date to 'MONTH DAY YEAR'
+        po_date_formatted = po_date_dt.strftime('%B %d %Y').upper()
+    else:
+        po_date_formatted = 'N/A'
+
+    # Prepare the final string
+    po_date = f"Date: {po_date_formatted}"
+    # po_date = f"Date: {meta_data.get('po_date', 'N/A')}"
+
+    po_number_width = c.stringWidth(po_number, "Helvetica", Text_size)
+    po_date_width = c.stringWidth(po_date, "Helvetica", Text_size)
+
+    # Align the smaller text to the right
+    po_number_x = page_width - margin_width - po_number_width
+    po_date_x = page_width - margin_width - po_date_width
+    
+    po_number_y = title_y - 15  # Slightly below the title
+    po_date_y = po_number_y - 15  # Slightly below the PO number
+    
+    # Draw the smaller text on the canvas
+    c.drawString(po_number_x, po_number_y, po_number)
+    c.drawString(po_date_x, po_date_y, po_date)
+
+    # Separate lines for sender and ship to data
+    sender_data = [
+        f"SENDER:",
+        f"{meta_data.get('sender_name', 'N/A')}",
+        f"{meta_data.get('sender_company_name', 'N/A')}",
+        f"{meta_data.get('sender_company_address_1', 'N/A')}",
+        f"{meta_data.get('sender_company_address_2', 'N/A')}",
+        f"{meta_data.get('sender_company_address_3', 'N/A')}",
+        f"{meta_data.get('sender_company_country', 'N/A')}"
+    ]
+
+    ship_to_data = [
+        f"SHIP TO:",
+        f"{meta_data.get('ship_to_name', 'N/A')}",
+        f"{meta_data.get('ship_to_address_1', 'N/A')}",
+        f"{meta_data.get('ship_to_address_2', 'N/A')}",
+        f"{meta_data.get('ship_to_address_3', 'N/A')}"
+    ]
+
+    # Combine sender and ship-to data into pairs
+    max_length = max(len(sender_data), len(ship_to_data))
+    table_data = [
+        [sender_data[i] if i < len(sender_data) else '', 
+        ship_to_data[i] if i < len(ship_to_data) else '']
+        for i in range(max_length)
+    ]
+
+    # Calculate column widths dynamically
+    sender_width = max(c.stringWidth(line, "Helvetica", 12) for line in sender_data)
+    ship_to_width = max(c.stringWidth(line, "Helvetica", 12) for line in ship_to_data)
+
+    total_width = sender_width + ship_to_width
+    scaling_factor = available_width / total_width
+
+    sender_width *= scaling_factor
+    ship_to_width *= scaling_factor
+
+    # Define the table style
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.white),  # Background color for the first row
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),   # Text color for the first row
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Bold font for the first row
+        ('FONTSIZE', (0, 0), (-1, 0), 12),  # Font size for the first row
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),  # No bottom padding for all rows
+        ('TOPPADDING', (0, 0), (-1, -1), 0),     # No top padding for all rows
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),    # No left padding for all rows
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),   # No right padding for all rows
+    ])
+
+    table = Table(table_data, colWidths=[sender_width, ship_to_width])
+    table.setStyle(table_style)
+
+    # Calculate the position for the table
+    table_width, table_height = table.wrap(available_width, available_height)
+    table_x = margin_width
+    table_y = po_date_y - table_height - 40  # Adjust this value to control spacing
+    
+    # Draw the table on the canvas
+    table.wrapOn(c, available_width, available_height)
+    table.drawOn(c, table_x, table_y)
+
+    # ------- Draw the comments---------
+    c.setFont("Helvetica-Bold", Text_size)
+    comments_y = table_y - 30
+    c.drawString(margin_width, comments_y, "COMMENTS OR SPECIAL INSTRUCTIONS")
+    #comments_y -= 5
+
+    # List of comments from meta_data
+    comments = [
+        meta_data.get('comments_1', ''),
+        meta_data.get('comments_2', ''),
+        meta_data.get('comments_3', ''),
+        meta_data.get('comments_4', ''),
+        meta_data.get('comments_5', ''),
+        meta_data.get('comments_6', ''),
+        meta_data.get('comments_7', ''),
+        meta_data.get('comments_8', ''),
+        meta_data.get('comments_9', ''),
+        meta_data.get('comments_10', '')
+    ]
+
+    # Convert all comments to strings and filter out empty or 'nan' comments
+    filtered_comments = [str(comment) for comment in comments if str(comment).strip() and str(comment).lower() != 'nan']
+
+    # Create a style for the comments
+    styles = getSampleStyleSheet()
+    bullet_style = ParagraphStyle(
+        'Bullet',
+        parent=styles['BodyText'],
+        leftIndent=20,       # Offset for all lines
+        firstLineIndent=-6,  # Negative offset to bring bullet back
+        spaceBefore=0,       # No space before the paragraph
+        spaceAfter=2,        # No space after the paragraph
+        leading=12           # Line height
+    )
+
+    # Draw the bullet points for each comment
+    for comment in filtered_comments:
+        para = Paragraph(f"• {comment}", bullet_style)
+        width, height = para.wrap(available_width, available_height)  # Measure the width and height of the paragraph
+        comments_y -= (height + bullet_style.spaceAfter)  # Adjust the position for the next comment
+        para.drawOn(c, margin_width, comments_y)
+
+    #-----------SKU TABLE-----------
+
+    # Set up the table headers
+    table_headers = ["ITEM #", "QTY", "Description", "Sample", "Barcode", "Total (USD)"]
+
+    item_no_col_width = 40
+    qty_col_width = 30
+    description_col_width = 260
+    sample_image_col_width = 75
+    barcode_col_width = 75
+    total_col_width = 60
+
+    col_widths = [item_no_col_width, qty_col_width, description_col_width, sample_image_col_width, barcode_col_width, total_col_width]
+    header_height = 25
+    row_height = 50
+    font_height = get_string_height("This is a test", "Helvetica", Text_size)  # Example usage, replace with actual font and size
+    x_start = margin_width  # Starting x position for the table
+    line_spacing = 5
+
+    # Left edge of every column, plus the right edge of the table
+    col_x = [x_start]
+    for width in col_widths:
+        col_x.append(col_x[-1] + width)
+    x_end = col_x[-1]
+
+    # Wrap every description to its column up front; the row heights are
+    # needed to plan the pages. Rows grow past row_height to fit long titles
+    description_width = description_col_width - 10
+    line_pitch = font_height + line_spacing / 2
+
+    def describe(sku, title):
+        # The description's lines. wrap_text is memoized, so drawing the row
+        # asks again instead of keeping every line's wrapped text around
+        return (wrap_text(f'{title}.', "Helvetica", Text_size, description_width, MAX_TITLE_LINES)
+                + wrap_text(f'See attachment "{sku}_DESIGN.png"', "Helvetica", Text_size, description_width, MAX_ATTACHMENT_LINES))
+
+    row_heights = array('d', (max(row_height, math.ceil(font_height + (len(describe(sku, title)) - 1) * line_pitch + 2 * line_spacing + 4)) for qty, sku, title, barcode in selected_products))
+
+    #----------- Additional Items -----------
+    final_row_height = 15
+    additional_items = [
+        "SUBTOTAL",
+        "SALES TAX",
+        "WARNING STICKERS, BARCODE STICKERS, AND OPAQUE POLY BAG + LABOR",
+        "SHIPPING",
+        "TRANSACTION FEE",
+        "TOTAL"
+    ]
+
+    # Work out every page before drawing anything. The table header on the first
+    # page sits below the comments; continuation pages repeat it at the top margin
+    pages = plan_pages(
+        row_heights=row_heights,
+        total_count=len(additional_items),
+        first_table_top=comments_y - 50 + header_height,
+        continuation_top=page_height - margin_height,
+        bottom_limit=margin_height,
+        header_height=header_height,
+        total_row_height=final_row_height
+    )
+
+    # The pages drawn here: all of them, or one chunk for a shard worker.
+    # Everything before this point lays out the whole PO, so item numbers,
+    # page numbers and the grid come out the same either way
+    first_page, last_page = shard_range(len(pages), *shard) if shard else (1, len(pages))
+    drawn_pages = pages[first_page - 1:last_page]
+    drawn_rows = range(drawn_pages[0]["first_row"], drawn_pages[-1]["first_row"] + drawn_pages[-1]["row_count"]) if drawn_pages else range(0)
+
+    # Extended line totals, filled in by apply_pricing
+    line_totals = meta_data.get('line_totals')
+
+    # Decode and downscale the SKU images in the background, ahead of the
+    # rows that draw them. Each SKU is only loaded once per PO
+    def load_thumbnail(sku):
+        image_path, width, height = get_thumbnail(f"assets/{sku}.jpg", sample_image_col_width, row_height, image_dpi, jpeg_quality)
+        if reproducible:
+            image_path = content_copy(image_path)
+        return image_path, width, height
+
+    thumbnail_pool = ThreadPoolExecutor()
+    thumbnails = {}
+    for row in drawn_rows:
+        sku = selected_products[row][1]
+        if sku not in thumbnails:
+            thumbnails[sku] = thumbnail_pool.submit(load_thumbnail, sku)
+
+    def draw_table_header(table_top):
+        # The header row is the same on every page, so it is stored once per
+        # document as a form (drawn with its bottom edge at 0) and referenced
+        # from every page
+        if not c.hasForm("table_header"):
+            c.beginForm("table_header", x_start - 1, -1, x_end + 1, header_height + 1)
+            c.setFont("Helvetica-Bold", Text_size)
+
+            # Draw table headers
+            for i, header in enumerate(table_headers):
+                # Calculate center position for each header
+                header_width = string_width(header, "Helvetica-Bold", Text_size)  # Get the width of the header string
+                header_x = col_x[i] + (col_widths[i] - header_width) / 2
+                c.drawString(header_x, (header_height - font_height) / 2, header)
+
+            # Draw a line above the headers
+            c.line(x_start, header_height, x_end, header_height)
+
+            # Draw a line under the headers
+            c.line(x_start, 0, x_end, 0)
+            c.endForm()
+
+        c.saveState()
+        c.translate(0, table_top - header_height)
+        c.doForm("table_header")
+        c.restoreState()
+
+        c.setFont("Helvetica", Text_size)
+
+    def draw_row(idx, y_pos, height, qty, sku, title, barcode):
+        # Description: the wrapped title, then "See attachment ..." (Not centered horizontally)
+        description = describe(sku, title)
+
+        # Lowest line of the description, with the block centred in the row
+        description_y_pos = y_pos + (height - font_height - (len(description) - 1) * line_pitch) / 2
+
+        # Baseline for single-line cells
+        text_y_pos = y_pos + (height - font_height) / 2 + font_height / 4
+
+        # Item Number. Helvetica's digits all have the same width, so it is
+        # measured by length rather than filling the width cache with every number
+        c.drawString(col_x[0] + (col_widths[0] - len(str(idx)) * string_width("0", "Helvetica", Text_size)) / 2, text_y_pos, str(idx))
+
+        # Quantity
+        c.drawString(col_x[1] + (col_widths[1] - string_width(str(qty), "Helvetica", Text_size)) / 2, text_y_pos, str(qty))
+
+        for line_number, line in enumerate(reversed(description)):
+            c.drawString(col_x[2] + 5, description_y_pos + line_number * line_pitch + font_height / 4, line)
+
+        # Sample Image
+        try:
+            # Time spent waiting here means the prefetch fell behind the rows
+            with timed("image_wait"):
+                image_path, img_width, img_height = thumbnails[sku].result()
+
+            # Calculate scaling factor
+            scale_factor = min(sample_image_col_width / img_width, row_height / img_height)
+
+            # Calculate new dimensions
+            new_width = img_width * scale_factor
+            new_height = img_height * scale_factor
+
+            # Calculate positions to center the image
+            image_x = col_x[3] + (col_widths[3] - new_width) / 2
+            image_y = y_pos + (height - new_height) / 2
+
+            # Draw the image. reportlab embeds each file once per volume and
+            # refers back to it for repeated SKUs
+            c.drawImage(image_path, image_x, image_y, width=new_width, height=new_height, preserveAspectRatio=True)
+            use_image(image_path)
+        except IOError:
+            # Handle the case where the image does not exist
+            c.drawString(col_x[3] + (col_widths[3] - string_width("No Image", "Helvetica", Text_size)) / 2, y_pos + (height - font_height) / 2, "No Image")
+
+        # Barcode, either as scannable bars with the digits under them or as plain digits
+        if vector_barcodes:
+            draw_barcode(c, barcode, col_x[4] + 3, y_pos + (height - row_height) / 2 + 3, col_widths[4] - 6, row_height - 6)
+        else:
+            c.drawString(col_x[4] + (col_widths[4] - string_width(str(barcode), "Helvetica", Text_size)) / 2, text_y_pos, str(barcode))
+
+        # Total, when the order was priced from the catalog
+        if line_totals:
+            line_total = f"{line_totals[idx - 1]:.2f}"
+            c.drawString(col_x[5] + (col_widths[5] - string_width(line_total, "Helvetica", Text_size)) / 2, text_y_pos, line_total)
+
+        # Draw horizontal line for each row
+        c.line(x_start, y_pos, x_end, y_pos)
+
+    # The totals are centred on the Total column, offset by the width of the
+    # last item number like the line items above them
+    buffer = 5
+    total_x_pos = col_x[5] + (col_widths[5] - c.stringWidth(str(len(selected_products)))) / 2
+
+    def format_total(item):
+        if item == 'SUBTOTAL':
+            subtotal = meta_data.get('subtotal', 'N/A')
+            return f"{subtotal:.2f}"
+        elif item == 'SALES TAX':
+            return "EXEMPT"
+        elif item == 'WARNING STICKERS, BARCODE STICKERS, AND OPAQUE POLY BAG + LABOR':
+            return "INCL"
+        elif item == 'SHIPPING':
+            shipping = meta_data.get('shipping', 'N/A')
+            # Hand the case where shipping is 'INCL'
+            if isinstance(shipping, str) and shipping.upper() == 'INCL':
+                return 'INCL'
+            return f"{shipping:.2f}"
+        elif item == 'TRANSACTION FEE':
+            transaction_fee = meta_data.get('transaction_fee', 'N/A')
+            return f"{transaction_fee:.2f}"
+        elif item == 'TOTAL':
+            total = meta_data.get('total', 'N/A')
+            return f"{total:.2f}"
+
+    def draw_total(item, item_y_pos):
+        # Draw the item name, aligned to the right of the Barcode column
+        item_x_pos = col_x[5] - string_width(item, "Helvetica", Text_size) - buffer
+        c.drawString(item_x_pos, item_y_pos + (final_row_height - font_height) / 2, item)
+
+        value = format_total(item)
+        c.drawString(total_x_pos - string_width(value, "Helvetica", Text_size) / 2 + buffer, item_y_pos + (final_row_height - font_height) / 2, value)
+
+        # Draw lines to separate items
+        c.line(col_x[5], item_y_pos, x_end, item_y_pos)
+
+    # Execute the plan, one page at a time
+    page_bytes = 0
+    for page_number, page in enumerate(drawn_pages, start=first_page):
+        if page_number > 1:
+            # Start a new volume rather than let this one grow past a limit,
+            # assuming the next page comes out about as big as the last
+            if (max_pages and volume["pages"] >= max_pages) or (max_volume_bytes and volume["bytes"] + page_bytes > max_volume_bytes):
+                save_volume()
+                volume.update(number=volume["number"] + 1, pages=0, bytes=0, images=set())
+                c = create_canvas(volume_file(po_number, volume["number"]), meta_data, reproducible)
+            else:
+                add_new_page()
+
+        c.setFont("Helvetica", Text_size)
+        y_pos = page["rows_top"]
+
+        if page["table_top"] is not None:
+            draw_table_header(page["table_top"])
+
+            for idx in range(page["first_row"], page["first_row"] + page["row_count"]):
+                qty, sku, title, barcode = selected_products[idx]
+                y_pos -= row_heights[idx]
+                draw_row(idx + 1, y_pos, row_heights[idx], qty, sku, title, barcode)
+
+            # Draw vertical lines for the grid
+            for x_pos in col_x:
+                c.line(x_pos, page["table_top"], x_pos, y_pos)
+
+        if page["total_count"]:
+            totals_top = page["totals_top"]
+
+            # Totals that start a page need their own top line; otherwise
+            # the last row of the table closes the box
+            if page["table_top"] is None:
+                c.line(col_x[5], totals_top, x_end, totals_top)
+
+            item_y_pos = totals_top
+            for item in additional_items[page["first_total"]:page["first_total"] + page["total_count"]]:
+                item_y_pos -= final_row_height
+                draw_total(item, item_y_pos)
+
+            # Draw lines to the left and right of the items to make boxes
+            c.line(col_x[5], totals_top, col_x[5], item_y_pos)
+            c.line(x_end, totals_top, x_end, item_y_pos)
+
+        # Draw the page number, right-aligned in the bottom margin
+        page_label = f"Page {page_number} of {len(pages)}"
+        c.setFont("Helvetica", Text_size)
+        c.drawString(page_width - margin_width - string_width(page_label, "Helvetica", Text_size), margin_height / 2 + get_string_height("Page", "Helvetica", Text_size) / 2, page_label)
+
+        volume["pages"] += 1
+        if max_volume_bytes:
+            # The page's content stream as it will be written (reportlab
+            # compresses it with zlib on save), and the page object that
+            # lists the page's images. The stream is reportlab-internal, so
+            # if a version doesn't have it only the page object is counted
+            page_code = getattr(c, "_code", None) or []
+            page_bytes = len(zlib.compress(" ".join(page_code).encode("latin-1", "replace"), 1)) * stream_scale + PAGE_OBJECT_BYTES
+            volume["bytes"] += page_bytes
+
+    thumbnail_pool.shutdown()
+
+    for sku, thumbnail in thumbnails.items():
+        if thumbnail.exception() is None:
+            image_bytes[f"assets/{sku}.jpg"] = thumbnail.result()[0]
+
+    # Measure before eviction can remove any of the resampled files
+    source_image_bytes = sum(os.path.getsize(source) for source in image_bytes)
+    embedded_image_bytes = sum(os.path.getsize(embedded) for embedded in image_bytes.values())
+    add_count("image_source_bytes", source_image_bytes)
+    add_count("image_embedded_bytes", embedded_image_bytes)
+
+    evict_thumbnail_cache()
+
+    add_count("line_items", len(drawn_rows))
+    add_count("pages", len(drawn_pages))
+
+    # The canvas's owner carries on from the last page drawn
+    if into is not None:
+        return first_page, last_page
+
+    # Save the PDF file (the last volume). The design files travel inside
+    # the PDF instead of next to it
+    save_volume()
+    add_count("volumes", volume["number"])
+
+    if volume["number"] > 1:
+        print(f"PDF report generated in {volume['number']} volumes: {', '.join(volume_files(po_number))}")
+    else:
+        print(f"PDF report generated: {pdf_file}")
+    print(f"Images: {len(image_bytes)} embedded at {image_dpi} DPI, {source_image_bytes} bytes of source images reduced to {embedded_image_bytes} bytes.")
+    return pdf_file
@@ -0,0 +1,169 @@
+from concurrent.futures import ThreadPoolExecutor
+
+def open_file_dialog():
+    # Only the interactive mode needs Tkinter, so import it here
+    import tkinter as tk
+    from tkinter import filedialog
+
+    # Initialize Tkinter root
+    root = tk.Tk()
+    root.withdraw()  # Hide the root window
+
+    # Open file dialog
+    file_path = filedialog.askopenfilename(
+        title="Select a Spreadsheet",
+        filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+    )
+    
+    if file_path:
+        return file_path
+    else:
+        print("No file selected")
+        return None
+
+def build_search_index(skus):
+    # Lower-case search text for every row, plus a trigram index: each
+    # three-character substring maps to the rows that contain it
+    texts = [f"{product['SKU']} {product['Title']}".lower() for product in skus]
+    trigrams = {}
+
+    for row, text in enumerate(texts):
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            postings = trigrams.get(gram)
+            if postings is None:
+                postings = trigrams[gram] = []
+            postings.append(row)
+
+    return {"texts": texts, "trigrams": trigrams}
+
+# Search indexes being built or already built, keyed by id() of the catalog list.
+# The picker runs once per order line, so the index is only built once per catalog
+search_index_cache = {}
+
+def get_search_index(skus):
+    # Start building the index in the background and return a future for it
+    cached = search_index_cache.get(id(skus))
+    if cached is None or cached[0] is not skus:
+        # Shut down right away: the thread finishes the build and exits
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(build_search_index, skus)
+        executor.shutdown(wait=False)
+        cached = search_index_cache[id(skus)] = (skus, future)
+    return cached[1]
+
+def search_index(index, query, candidates=None):
+    # Return the rows whose SKU or Title contain the query. candidates can
+    # narrow the search, e.g. to the matches of a shorter query
+    texts = index["texts"]
+    query = query.lower()
+
+    if not query:
+        return list(range(len(texts)))
+
+    if len(query) >= 3:
+        # Only rows containing the query's rarest trigram can match
+        postings = [index["trigrams"].get(query[i:i + 3], ()) for i in range(len(query) - 2)]
+        rarest = min(postings, key=len)
+        if candidates is None or len(rarest) < len(candidates):
+            candidates = rarest
+
+    if candidates is None:
+        candidates = range(len(texts))
+
+    return [row for row in candidates if query in texts[row]]
+
+def get_user_input(screen, skus):
+    import curses
+
+    def format_row(product):
+        return f"{product['SKU']}  {product['Title']}  {product['Barcode']}"
+
+    index = get_search_index(skus)
+    query = ""
+    matches = list(range(len(skus)))
+    selected_index = 0  # position within matches
+    top_index = 0  # first position shown on screen
+
+    # What is currently on each screen line, so only changed lines get redrawn
+    drawn = {}
+
+    while True:
+        page_size = max(1, curses.LINES - 2)  # Reserve space for header and navigation
+        width = max(1, curses.COLS - 1)
+
+        # Keep the selection on screen
+        if selected_index < top_index:
+            top_index = selected_index
+        elif selected_index >= top_index + page_size:
+            top_index = selected_index - page_size + 1
+
+        lines = {0: (f"Select SKU (type to search, Esc to clear, Enter to pick): {query}", curses.A_NORMAL)}
+
+        for idx in range(page_size):
+            position = top_index + idx
+            if position < len(matches):
+                text = format_row(skus[matches[position]])
+                if position == selected_index:
+                    lines[idx + 1] = (f"> {text}", curses.A_REVERSE)
+                else:
+                    lines[idx + 1] = (f"  {text}", curses.A_NORMAL)
+            else:
+                lines[idx + 1] = ("", curses.A_NORMAL)
+
+        page_count = max(1, (len(matches) + page_size - 1) // page_size)
+        lines[page_size + 1] = (f"{len(matches)} of {len(skus)} SKUs - Page {top_index // page_size + 1} of {page_count}  (PgUp/PgDn/Home/End)", curses.A_NORMAL)
+
+        for line_number, (text, attribute) in lines.items():
+            text = text[:width]
+            if drawn.get(line_number) != (text, attribute):
+                screen.move(line_number, 0)
+                screen.clrtoeol()
+                screen.addstr(line_number, 0, text, attribute)
+                drawn[line_number] = (text, attribute)
+
+        screen.move(0, min(width, len(lines[0][0])))
+        key = screen.getch()
+
+        if key == curses.KEY_UP:
+            selected_index = max(0, selected_index - 1)
+        elif key == curses.KEY_DOWN:
+            selected_index = min(len(matches) - 1, selected_index + 1)
+        elif key == curses.KEY_PPAGE:
+            selected_index = max(0, selected_index - page_size)
+            top_index = max(0, top_index - page_size)
+        elif key == curses.KEY_NPAGE:
+            selected_index = min(len(matches) - 1, selected_index + page_size)
+            top_index = min(max(0, len(matches) - page_size), top_index + page_size)
+        elif key == curses.KEY_HOME:
+            selected_index = 0
+        elif key == curses.KEY_END:
+            selected_index = len(matches) - 1
+        elif key == curses.KEY_RESIZE:
+            curses.update_lines_cols()
+            screen.erase()
+            drawn = {}
+        elif key == curses.KEY_ENTER or key in [10, 13]:
+            if matches:
+                return skus[matches[selected_index]]
+        elif key in (curses.KEY_BACKSPACE, 8, 127, 27) or 32 <= key < 127:
+            if key == 27:
+                new_query = ""
+            elif key in (curses.KEY_BACKSPACE, 8, 127):
+                new_query = query[:-1]
+            else:
+                new_query = query + chr(key)
+
+            if new_query == query:
+                continue
+
+            # A longer query can only match a subset of the current matches
+            if query and new_query.startswith(query):
+                matches = search_index(index.result(), new_query, matches)
+            else:
+                matches = search_index(index.result(), new_query)
+
+            query = new_query
+            selected_index = 0
+            top_index = 0
+
+        selected_index = max(0, min(selected_index, len(matches) - 1))
@@ -0,0 +1,96 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from .instrumentation import timed
+
+# Unit prices are held as whole numbers of 1/10000 USD, so the line totals
+# can be computed on integer arrays without losing a cent
+PRICE_DECIMALS = 4
+CENT = Decimal("0.01")
+
+def to_decimal(value):
+    # Exact decimal for a spreadsheet value, going through its shortest text
+    # form so 12.99 stays 12.99. None for blanks and NaN
+    if value is None or value == "" or value != value:
+        return None
+    if isinstance(value, str) and value.strip().upper() == "INCL":
+        return None
+
+    try:
+        number = Decimal(str(value).strip().replace(",", "").lstrip("$"))
+    except InvalidOperation as e:
+        raise ValueError(f"'{value}' is not an amount.") from e
+
+    if not number.is_finite():
+        return None
+    return number
+
+def to_price_units(price):
+    # A unit price in 1/10000 USD. Prices with more decimals than that can't
+    # be represented exactly, so they are refused rather than rounded
+    units = price.scaleb(PRICE_DECIMALS)
+    if units != units.to_integral_value():
+        raise ValueError(f"Unit price {price} has more than {PRICE_DECIMALS} decimal places.")
+    return int(units)
+
+@timed("price_order")
+def price_order(selected_products, products_by_sku):
+    # Extended line totals and the subtotal, in one pass over integer arrays.
+    # Each line is rounded half up to the cent, and the subtotal is the sum
+    # of the rounded lines, as on the printed PO. Returns (line_totals,
+    # subtotal) as Decimals, or None if the catalog has no unit prices
+    import numpy as np
+
+    unit_prices = []
+    for qty, sku, title, barcode in selected_products:
+        product = products_by_sku[str(sku)]
+        if "Price" not in product:
+            return None
+
+        # Quantities typed in interactively haven't been checked yet
+        if not str(qty).strip().isdigit():
+            raise ValueError(f"Invalid quantity '{qty}' for SKU {sku}.")
+
+        price = to_decimal(product["Price"])
+        if price is None:
+            raise ValueError(f"SKU {sku} has no unit price in the spreadsheet.")
+        unit_prices.append(to_price_units(price))
+
+    quantities = np.array([int(str(qty).strip()) for qty, sku, title, barcode in selected_products], dtype=np.int64)
+    extended = quantities * np.array(unit_prices, dtype=np.int64)
+
+    # From 1/10000 USD to cents, rounding halves away from zero
+    half = 10 ** (PRICE_DECIMALS - 2) // 2
+    line_cents = np.sign(extended) * ((np.abs(extended) + half) // 10 ** (PRICE_DECIMALS - 2))
+
+    line_totals = [Decimal(int(cents)).scaleb(-2) for cents in line_cents]
+    subtotal = Decimal(int(line_cents.sum())).scaleb(-2)
+    return line_totals, subtotal
+
+def apply_pricing(selected_products, products_by_sku, meta_data):
+    # Price the order from the catalog's unit prices and return the meta data
+    # with the computed subtotal and total, and the per-line totals under
+    # "line_totals". Subtotals and totals given on the meta data sheet must
+    # match the computed ones; a mismatch raises ValueError. Without unit
+    # prices in the catalog the meta data is returned unchanged
+    priced = price_order(selected_products, products_by_sku)
+    if priced is None:
+        return meta_data
+
+    line_totals, subtotal = priced
+
+    # TOTAL = SUBTOTAL + SHIPPING + TRANSACTION FEE; sales tax is exempt and
+    # shipping may be INCL
+    total = subtotal
+    for field in ("shipping", "transaction_fee"):
+        amount = to_decimal(meta_data.get(field))
+        if amount is not None:
+            total += amount
+    total = total.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+    for field, computed in (("subtotal", subtotal), ("total", total)):
+        given = to_decimal(meta_data.get(field))
+        if given is not None and given.quantize(CENT, rounding=ROUND_HALF_UP) != computed:
+            raise ValueError(f"{po_number}: the meta data sheet gives a {field} of {given:.2f}, but the order lines add up to {computed:.2f}.")
+
+    return dict(meta_data, subtotal=subtotal, total=total, line_totals=line_totals)
@@ -0,0 +1,109 @@
+import hashlib
+import shutil
+import json
+import os
+
+from .pdf import LAYOUT_VERSION, check_po_number, generate_pdf, volume_file, volume_files, remove_volumes
+from .images import evict_cache
+from .barcodes import normalize_barcode
+from .instrumentation import timed, add_count, set_field
+
+# Finished PDFs, named by a hash of everything that went into them
+RENDER_CACHE_FOLDER = os.path.join("cache", "renders")
+RENDER_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+def file_state(file_path):
+    # Modification time and size, or None for a file that doesn't exist
+    # (a missing SKU photo is drawn as "No Image", so that is a state too)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def render_key(selected_products, meta_data, render_options=None):
+    # Hash of the normalized lines, meta data, render options, layout version
+    # and the state of every file generate_pdf reads
+    render_options = render_options or {}
+    skus = list(dict.fromkeys(f"{sku}" for qty, sku, title, barcode in selected_products))
+
+    files = [os.path.join("assets", "logo.jpg")]
+    files += [os.path.join("assets", f"{sku}.jpg") for sku in skus]
+    if render_options.get("attach_designs"):
+        files += [os.path.join("assets", f"{sku}_DESIGN.png") for sku in skus]
+
+    # Quantities typed in interactively are strings, those from order files
+    # are numbers; both print the same, so they hash the same
+    key = {
+        "layout": LAYOUT_VERSION,
+        "lines": [[f"{qty}".strip(), f"{sku}", f"{title}", normalize_barcode(barcode)] for qty, sku, title, barcode in selected_products],
+        "meta_data": meta_data,
+        # Sharded renders are the same PDF as serial ones
+        "render_options": {name: value for name, value in render_options.items() if name != "shards"},
+        "files": {file_path: file_state(file_path) for file_path in files},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def cache_file(cache_folder, key, volume, volume_count):
+    # {key}.pdf, or {key}.vol{volume}of{volume_count}.pdf for a PO that was
+    # split into volumes
+    if volume_count == 1:
+        return os.path.join(cache_folder, f"{key}.pdf")
+    return os.path.join(cache_folder, f"{key}.vol{volume}of{volume_count}.pdf")
+
+def cached_volumes(cache_folder, key):
+    # The cached files of a render in volume order, or None if it isn't in
+    # the cache (or eviction has removed any of its volumes)
+    if os.path.exists(cache_file(cache_folder, key, 1, 1)):
+        return [cache_file(cache_folder, key, 1, 1)]
+
+    try:
+        names = [name for name in os.listdir(cache_folder) if name.startswith(f"{key}.vol") and name.endswith(".pdf")]
+    except FileNotFoundError:
+        return None
+    if not names:
+        return None
+
+    volume_count = int(names[0][:-len(".pdf")].rsplit("of", 1)[1])
+    files = [cache_file(cache_folder, key, volume, volume_count) for volume in range(1, volume_count + 1)]
+    if not all(os.path.exists(file_path) for file_path in files):
+        return None
+    return files
+
+@timed("render_pdf")
+def render_pdf(selected_products, meta_data, render_options=None, cache_folder=RENDER_CACHE_FOLDER):
+    # generate_pdf, unless the same PO was rendered before: then the cached
+    # PDF is copied to {po_number}.pdf instead (and to {po_number}_vol2.pdf,
+    # ... for a PO split into volumes). Returns the first PDF file name
+    po_number = check_po_number(f"{meta_data.get('po_number', 'N/A')}")
+    pdf_file = volume_file(po_number, 1)
+    set_field("po_number", po_number)
+    key = render_key(selected_products, meta_data, render_options)
+    cached_files = cached_volumes(cache_folder, key)
+
+    if cached_files:
+        for volume, cached_file in enumerate(cached_files, start=1):
+            shutil.copyfile(cached_file, volume_file(po_number, volume))
+
+            # Touch the file so eviction drops the least recently used renders first
+            os.utime(cached_file)
+        remove_volumes(po_number, len(cached_files) + 1)
+
+        add_count("render_cache_hits")
+        print(f"PDF report unchanged, reused from the render cache: {pdf_file}")
+        return pdf_file
+
+    add_count("render_cache_misses")
+    generate_pdf(selected_products, meta_data, **(render_options or {}))
+
+    # Copy to a temporary name first so parallel runs never see a partial file
+    os.makedirs(cache_folder, exist_ok=True)
+    pdf_files = volume_files(po_number)
+    for volume, volume_pdf in enumerate(pdf_files, start=1):
+        cached_file = cache_file(cache_folder, key, volume, len(pdf_files))
+        temporary_file = f"{cached_file}.{os.getpid()}.tmp"
+        shutil.copyfile(volume_pdf, temporary_file)
+        os.replace(temporary_file, cached_file)
+
+    evict_cache(cache_folder, RENDER_CACHE_MAX_BYTES)
+    return pdf_file
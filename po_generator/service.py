@@ -0,0 +1,334 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import socketserver
+import threading
+import signal
+import json
+import time
+import sys
+import os
+
+from .spreadsheet import read_spreadsheet, index_by_sku, check_order_lines, parse_order_lines
+from .pricing import apply_pricing
+from .render_cache import render_pdf
+from .pdf import generate_pdf, volume_files, check_po_number
+from .cli import render_and_package
+from .instrumentation import reset_record, snapshot_record, write_record
+
+# Largest request body accepted, in bytes
+MAX_REQUEST_BYTES = 10 * 1024 * 1024
+
+# The catalog and default meta data, kept in memory between requests and
+# re-read when the workbook changes on disk
+catalog_lock = threading.Lock()
+catalog = {"path": None, "mtime_ns": None, "products_by_sku": {}, "meta_data": {}}
+
+# One lock per PO number: renders write {po_number}.pdf to the working
+# folder, so two requests for the same PO must not run at the same time
+po_locks_lock = threading.Lock()
+po_locks = {}
+
+def load_catalog(file_path):
+    # Return (products_by_sku, meta_data), re-reading the workbook only if it
+    # changed since the last request
+    mtime_ns = os.stat(file_path).st_mtime_ns
+
+    with catalog_lock:
+        if catalog["path"] != file_path or catalog["mtime_ns"] != mtime_ns:
+            data_set, meta_data = read_spreadsheet(file_path)
+            catalog.update(path=file_path, mtime_ns=mtime_ns, products_by_sku=index_by_sku(data_set), meta_data=meta_data)
+            print(f"Catalog loaded: {len(data_set)} SKUs from '{file_path}'.")
+
+        return catalog["products_by_sku"], catalog["meta_data"]
+
+# The warmed-up render processes. A worker that dies (killed for memory on a
+# huge PO, a crash in PIL) breaks the whole pool, so it is replaced by a new
+# one rather than failing every request from then on
+pool_lock = threading.Lock()
+pool = {"executor": None, "workers": 0, "initargs": (), "restarts": 0}
+
+def get_po_lock(po_number):
+    with po_locks_lock:
+        return po_locks.setdefault(po_number, threading.Lock())
+
+def warm_up(selected_products, meta_data, render_options):
+    # Runs once in every worker process: a throwaway render pays for the
+    # reportlab/PIL imports, the font metrics and the logo thumbnail before
+    # the first real request does
+    meta_data = dict(meta_data, po_number=f"warm-up-{os.getpid()}")
+    try:
+        generate_pdf(selected_products, meta_data, **render_options)
+        for pdf_file in volume_files(meta_data["po_number"]):
+            os.remove(pdf_file)
+    except Exception as e:
+        print(f"Warm-up render failed: {e}", file=sys.stderr)
+
+def start_pool(workers, initargs):
+    # Start every worker now, so the warm-up is done before the first request
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=initargs)
+    for future in [executor.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+    return executor
+
+def replace_pool(broken_executor):
+    # Swap a broken pool for a new one (unless another request already has)
+    # and return the pool to use
+    with pool_lock:
+        if pool["executor"] is broken_executor:
+            broken_executor.shutdown(wait=False, cancel_futures=True)
+            pool["executor"] = start_pool(pool["workers"], pool["initargs"])
+            pool["restarts"] += 1
+            print(f"A render worker died; the pool was restarted ({pool['restarts']} restart(s) so far).", file=sys.stderr)
+        return pool["executor"]
+
+def run_in_pool(function, *args):
+    # Run function(*args) in a worker and return its result. A pool broken
+    # before this call is replaced and the call goes to the new one; if the
+    # worker dies while running it, the pool is replaced and only this call
+    # fails, with BrokenProcessPool
+    executor = pool["executor"]
+    try:
+        future = executor.submit(function, *args)
+    except BrokenProcessPool:
+        executor = replace_pool(executor)
+        future = executor.submit(function, *args)
+
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        replace_pool(executor)
+        raise
+
+def render_request(selected_products, meta_data, output, render_options, use_asset_store=False, barcode_sheet=False, archive_format=None):
+    # Runs in a worker process. Returns (PDF bytes or output path, error
+    # message or None, run record)
+    start = time.perf_counter()
+    reset_record()
+
+    def result(value, error):
+        return value, error, snapshot_record(mode="service", output=output, wall_seconds=round(time.perf_counter() - start, 6), error=error)
+
+    # A preview: just the PDF, straight from the render cache if it's there
+    if output == "pdf":
+        try:
+            pdf_file = render_pdf(selected_products, meta_data, render_options)
+            pdf_files = volume_files(f"{meta_data.get('po_number', 'N/A')}")
+            with open(pdf_file, "rb") as f:
+                data = f.read()
+            for volume_pdf in pdf_files:
+                os.remove(volume_pdf)
+        except Exception as e:
+            return result(None, f"Failed to generate PDF: {e}")
+
+        # A response carries one PDF
+        if len(pdf_files) > 1:
+            return result(None, f"The PDF was split into {len(pdf_files)} volumes; ask for the 'folder' output instead")
+        return result(data, None)
+
+    try:
+        error = render_and_package(selected_products, meta_data, use_asset_store, render_options, barcode_sheet, archive_format)
+    except ValueError as e:
+        error = str(e)
+
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+    output_path = os.path.join("outputs", f"{po_number}.{archive_format}" if archive_format else po_number)
+    return result(None if error else output_path, error)
+
+def make_handler(file_path, render_options, use_asset_store, barcode_sheet, archive_format, stats_path):
+
+    class RequestHandler(BaseHTTPRequestHandler):
+        # GET  /health  catalog size, workers and pool restarts, as JSON
+        # POST /render  {"lines": [{"sku": ..., "qty": ...}, ...], "meta": {...}, "output": "pdf" | "folder"}
+        #               "meta" overrides the workbook's meta data (po_number, ship_to_name, ...).
+        #               "pdf" returns the PDF itself; "folder" writes the PO folder (or archive)
+        #               and returns its path
+
+        def address_string(self):
+            # Unix socket clients have no address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+        def send_json(self, status, body):
+            data = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self.send_json(404, {"error": "Not found"})
+                return
+
+            try:
+                products_by_sku, meta_data = load_catalog(file_path)
+            except (OSError, ValueError) as e:
+                self.send_json(500, {"error": str(e)})
+                return
+
+            # A broken pool refuses new work right away, so this finds (and
+            # replaces) one without waiting for the workers
+            executor = pool["executor"]
+            try:
+                executor.submit(os.getpid)
+            except BrokenProcessPool:
+                try:
+                    replace_pool(executor)
+                except Exception as e:
+                    self.send_json(503, {"status": "error", "error": f"The render pool can't be restarted: {e}"})
+                    return
+
+            self.send_json(200, {"status": "ok", "skus": len(products_by_sku), "workers": pool["workers"], "pool_restarts": pool["restarts"]})
+
+        def do_POST(self):
+            if self.path != "/render":
+                self.send_json(404, {"error": "Not found"})
+                return
+
+            # The body is read by its length, so a request must give one
+            if self.headers.get("Content-Length") is None:
+                self.send_json(411, {"error": "Content-Length is required"})
+                return
+
+            try:
+                length = int(self.headers["Content-Length"])
+                if length < 0:
+                    raise ValueError(f"Invalid Content-Length {length}.")
+                if length > MAX_REQUEST_BYTES:
+                    self.send_json(413, {"error": f"Requests are limited to {MAX_REQUEST_BYTES} bytes"})
+                    return
+
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("The request must be a JSON object.")
+
+                output = request.get("output", "pdf")
+                if output not in ("pdf", "folder"):
+                    raise ValueError(f"Unknown output '{output}'; use 'pdf' or 'folder'.")
+
+                lines = request.get("lines")
+                if not lines:
+                    raise ValueError("The request has no order lines.")
+                check_order_lines(lines)
+
+                meta = request.get("meta", {})
+                if not isinstance(meta, dict):
+                    raise ValueError("\"meta\" must be an object.")
+
+                products_by_sku, meta_data = load_catalog(file_path)
+                meta_data = dict(meta_data, **meta)
+                check_po_number(f"{meta_data.get('po_number', 'N/A')}")
+                selected_products = parse_order_lines(lines, products_by_sku)
+                meta_data = apply_pricing(selected_products, products_by_sku, meta_data)
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                self.send_json(400, {"error": str(e)})
+                return
+            except OSError as e:
+                self.send_json(500, {"error": str(e)})
+                return
+
+            po_number = f"{meta_data.get('po_number', 'N/A')}"
+
+            with get_po_lock(po_number):
+                try:
+                    value, error, record = run_in_pool(render_request, selected_products, meta_data, output, render_options, use_asset_store, barcode_sheet, archive_format)
+                except Exception as e:
+                    value, error, record = None, f"Worker failed: {e}", None
+
+            if stats_path and record:
+                write_record(stats_path, record)
+
+            if error:
+                self.send_json(500, {"po_number": po_number, "error": error})
+            elif output == "pdf":
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(value)))
+                self.send_header("X-PO-Number", po_number)
+                self.end_headers()
+                self.wfile.write(value)
+            else:
+                self.send_json(200, {"po_number": po_number, "path": value})
+
+    return RequestHandler
+
+# Unix sockets only exist where the platform has AF_UNIX (not on Windows)
+if hasattr(socketserver, "UnixStreamServer"):
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    ThreadingUnixHTTPServer = None
+
+def parse_address(address):
+    # "8765" or "host:8765" is a TCP address, anything else a Unix socket path
+    host, _, port = address.rpartition(":")
+    if port.isdigit():
+        return (host or "127.0.0.1", int(port)), None
+    return None, address
+
+def serve(file_path, address, workers=None, render_options=None, use_asset_store=False, barcode_sheet=False, archive_format=None, stats_path=None):
+    # Keep the catalog and a pool of warmed-up render processes around and
+    # answer render requests until interrupted
+    render_options = render_options or {}
+
+    tcp_address, socket_path = parse_address(address)
+    if socket_path and ThreadingUnixHTTPServer is None:
+        print(f"Can't listen on {address}: Unix sockets are not supported on this platform; use a TCP port ('8765' or 'host:8765').", file=sys.stderr)
+        return 2
+
+    try:
+        products_by_sku, meta_data = load_catalog(file_path)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if not products_by_sku:
+        print(f"The spreadsheet '{file_path}' has no SKUs.", file=sys.stderr)
+        return 2
+
+    # The first SKU is enough to exercise every part of the renderer
+    sample_product = next(iter(products_by_sku.values()))
+    sample_products = [(1, sample_product["SKU"], sample_product["Title"], sample_product["Barcode"])]
+
+    workers = workers or os.cpu_count() or 1
+    initargs = (sample_products, meta_data, render_options)
+    pool.update(executor=start_pool(workers, initargs), workers=workers, initargs=initargs, restarts=0)
+
+    handler = make_handler(file_path, render_options, use_asset_store, barcode_sheet, archive_format, stats_path)
+
+    try:
+        if tcp_address:
+            server = ThreadingHTTPServer(tcp_address, handler)
+            where = f"http://{tcp_address[0]}:{server.server_address[1]}"
+        else:
+            # A socket file left behind by an earlier run would block the bind
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = ThreadingUnixHTTPServer(socket_path, handler)
+            where = f"unix socket {socket_path}"
+    except OSError as e:
+        print(f"Can't listen on {address}: {e}", file=sys.stderr)
+        pool["executor"].shutdown()
+        return 1
+
+    print(f"Serving on {where} with {workers} worker(s). Press Ctrl+C to stop.")
+
+    # Stop as cleanly on SIGTERM (kill, service managers) as on Ctrl+C
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool["executor"].shutdown(cancel_futures=True)
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+    return 0
@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from .pdf import generate_pdf, create_canvas, attach_files, volume_file, remove_volumes
+from .instrumentation import timed, add_count, reset_record, snapshot_record
+
+# Fewest line items worth a worker process of their own: below this,
+# starting the process costs more than drawing the pages saves
+MIN_SHARD_LINES = 500
+
+def render_shard(selected_products, meta_data, index, count, render_options):
+    # Runs in a worker process. Lays out the whole PO on a canvas of its own,
+    # draws the index-th of count page-aligned chunks of its pages and
+    # returns (first_page, last_page, objects, pdf_version, counters).
+    # objects are what the chunk's pages need, as (kind, name, object) in
+    # the order the worker's document registered them: "page" for the pages,
+    # with their content already compressed, "xobject" for the images and
+    # forms they use, and "font" with the font name for the fonts
+    from reportlab import rl_config
+    from reportlab.pdfbase.pdfdoc import PDFPage, PDFStream, PDFDictionary, PDFArray, PDFName, PDFBase85Encode, PDFZCompress
+
+    reset_record()
+    c = create_canvas(os.devnull, meta_data, render_options.get("reproducible"))
+    first_page, last_page = generate_pdf(selected_products, meta_data, into=c, shard=(index, count), **render_options)
+    c.showPage()
+
+    # Compress the page streams here rather than in the parent, the same way
+    # reportlab does on save
+    filters = [PDFBase85Encode, PDFZCompress] if rl_config.useA85 else [PDFZCompress]
+
+    fonts = {internal_name.lstrip("/"): font_name for font_name, internal_name in c._doc.fontMapping.items()}
+
+    objects = []
+    page_number = 1 if first_page == 1 else 0
+    for name, obj in c._doc.idToObject.items():
+        if name in fonts:
+            objects.append(("font", name, fonts[name]))
+        elif isinstance(obj, PDFPage):
+            # Page 0 holds the letterhead and addresses of page 1, drawn only
+            # to lay out the PO; the first chunk's worker returns page 1
+            if page_number:
+                content = obj.stream
+                for stream_filter in reversed(filters):
+                    content = stream_filter.encode(content)
+                obj.Contents = PDFStream(PDFDictionary({"Filter": PDFArray([PDFName(stream_filter.pdfname) for stream_filter in filters])}), content)
+                obj.Contents.__Comment__ = "page stream"
+                obj.stream = None
+                objects.append(("page", name, obj))
+            page_number += 1
+        elif name.startswith("FormXob."):
+            objects.append(("xobject", name, obj))
+
+    # They are registered again in the parent's document
+    for kind, name, obj in objects:
+        if kind != "font":
+            del obj.__InternalName__
+
+    # Drawing can raise the PDF version the document needs (table styles use
+    # transparency)
+    return first_page, last_page, objects, c._doc._pdfVersion, snapshot_record()["counters"]
+
+def merge_shards(document, results):
+    # Register the objects of every chunk in the parent's document, in the
+    # order a serial render registers them. Returns the number of pages.
+    # Raises ValueError if the chunks don't fit together
+    page_count = 0
+    for first_page, last_page, objects, pdf_version, counters in results:
+        document._pdfVersion = max(document._pdfVersion, pdf_version)
+
+        chunk_pages = 0
+        for kind, name, obj in objects:
+            if kind == "page":
+                document.addPage(obj)
+                chunk_pages += 1
+            elif kind == "font":
+                # Fonts are numbered in the order they are first used, which
+                # is the same in every chunk: they all draw page 1's header
+                # and then rows drawn alike
+                if document.getInternalFontName(obj) != f"/{name}":
+                    raise ValueError(f"the shards named the font {obj} differently")
+            elif name not in document.idToObject:
+                # An image or form is named after what it draws, so one
+                # already brought in by an earlier chunk is the same one
+                document.Reference(obj, name)
+
+        if chunk_pages != max(last_page - first_page + 1, 0):
+            raise ValueError(f"pages {first_page}-{last_page} came back as {chunk_pages} pages")
+        page_count += chunk_pages
+
+    return page_count
+
+def generate_pdf_sharded(selected_products, meta_data, shards, **render_options):
+    # Same as generate_pdf, with the pages drawn in up to shards worker
+    # processes. Each worker lays out the whole PO (cheap next to drawing
+    # it) and draws one page-aligned chunk, so item numbers, page numbers
+    # and the grid carry on across chunks. The chunks are then put together
+    # in the order a serial render registers everything, which gives the
+    # same PDF, byte for byte
+    po_number = f"{meta_data.get('po_number', 'N/A')}"
+    pdf_file = volume_file(po_number, 1)
+
+    shards = min(shards, len(selected_products) // MIN_SHARD_LINES)
+    if shards < 2:
+        return generate_pdf(selected_products, meta_data, **render_options)
+
+    # The design files are attached here, once
+    attach_designs = render_options.get("attach_designs")
+    shard_options = dict(render_options, attach_designs=False)
+
+    # Started first so reportlab is loaded before the workers start, which
+    # on Linux share it with this process instead of importing it again
+    c = create_canvas(pdf_file, meta_data, render_options.get("reproducible"))
+
+    # The workers and the merge rely on reportlab internals (the document's
+    # objects, font names and page streams). If a reportlab version changes
+    # them, the PO is rendered serially instead of risking a broken PDF (the
+    # serial render overwrites anything saved here)
+    try:
+        with ProcessPoolExecutor(max_workers=shards) as executor:
+            futures = [executor.submit(render_shard, selected_products, meta_data, index, shards, shard_options) for index in range(shards)]
+            with timed("shard_wait"):
+                results = [future.result() for future in futures]
+
+        remove_volumes(po_number)
+        page_count = merge_shards(c._doc, results)
+
+        if attach_designs:
+            attach_files(c, [os.path.join("assets", f"{sku}_DESIGN.png") for qty, sku, title, barcode in selected_products])
+
+        with timed("pdf_save"):
+            c.save()
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        print(f"Sharded rendering of {po_number} failed ({type(e).__name__}: {e}); rendering it in one process.")
+        add_count("shard_fallbacks")
+        return generate_pdf(selected_products, meta_data, **render_options)
+
+    for first_page, last_page, objects, pdf_version, counters in results:
+        for counter, amount in counters.items():
+            add_count(counter, amount)
+
+    add_count("pdf_bytes", os.path.getsize(pdf_file))
+    add_count("volumes")
+    add_count("shards", shards)
+
+    print(f"PDF report generated: {pdf_file} ({page_count} pages drawn in {shards} processes)")
+    return pdf_file
@@ -0,0 +1,200 @@
+import json
+import csv
+
+from .catalog import CATALOG_COLUMNS, PRICE_COLUMNS, Catalog
+from .instrumentation import timed
+
+# Categories read from the meta data sheet (one column each)
+META_CATEGORIES = [
+    'po_number', 'po_date', 'subtotal',	'shipping',	'transaction_fee',	'total', 'ship_to_name', 'ship_to_address_1', 'ship_to_address_2',
+    'ship_to_address_3', 'comments_1', 'comments_2', 'comments_3', 'comments_4',
+    'comments_5', 'comments_6', 'comments_7', 'comments_8', 'comments_9', 'comments_10',
+    'company_name', 'company_address_1', 'company_address_2', 'company_country',
+    'company_logo', 'sender_name', 'sender_company_name', 'sender_company_address_1',
+    'sender_company_address_2', 'sender_company_address_3', 'sender_company_country'
+]
+
+def normalize_number(value):
+    # Excel hands back whole numbers as floats (10.0), and a column with a
+    # single blank cell comes back as floats throughout, so 1001 would read
+    # as "1001.0" once made a string
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def is_blank(value):
+    # An empty cell (NaN), a missing value or whitespace
+    return value is None or (isinstance(value, float) and value != value) or not str(value).strip()
+
+def read_catalog_sheet(xl):
+    # Read the main sheet (first sheet), skipping every column the generator doesn't use
+    df = xl.parse(xl.sheet_names[0], usecols=lambda column: column in CATALOG_COLUMNS or column in PRICE_COLUMNS)
+
+    # Check if the DataFrame has columns named "SKU", "Title", and "Barcode"
+    missing_columns = [col for col in CATALOG_COLUMNS if col not in df.columns]
+        
+    if missing_columns:
+        raise ValueError(f"The spreadsheet is missing the following columns: {', '.join(missing_columns)}.")
+
+    # Unit prices are optional; without them the totals come from the meta data sheet
+    price_column = next((col for col in PRICE_COLUMNS if col in df.columns), None)
+    prices = df[price_column].tolist() if price_column else None
+
+    # Keep the rows column by column, indexed on SKU and barcode
+    return Catalog([normalize_number(sku) for sku in df['SKU'].tolist()], df['Title'].tolist(), df['Barcode'].tolist(), prices)
+
+def read_meta_row(df_meta, row):
+    meta_data = {}
+
+    # Extract values for each meta category if it exists in the meta data sheet
+    for category in META_CATEGORIES:
+        if category in df_meta.columns:
+            meta_data[category] = df_meta[category].iloc[row]
+            if category == 'po_number':
+                meta_data[category] = normalize_number(meta_data[category])
+        else:
+            meta_data[category] = ""  # or provide default value if needed
+
+    return meta_data
+
+@timed("read_spreadsheet")
+def read_spreadsheet(file_path):
+    import pandas as pd
+
+    try:
+        # Read the spreadsheet into a pandas ExcelFile object
+        xl = pd.ExcelFile(file_path)
+
+        data_set = read_catalog_sheet(xl)
+
+        # Initialize meta_data dictionary for additional categories
+        meta_data = {}
+
+        # Read data from the second sheet if it exists
+        if len(xl.sheet_names) > 1:
+            df_meta = xl.parse(xl.sheet_names[1])
+            meta_data = read_meta_row(df_meta, 0)
+
+        return data_set, meta_data
+    
+    except ValueError as ve:
+        raise ve
+    except Exception as e:
+        raise ValueError("Error reading spreadsheet.") from e
+
+@timed("read_workbook")
+def read_workbook(file_path):
+    # A multi-PO workbook has the catalog on the first sheet, one row per PO on
+    # the second sheet and the order lines (po_number, SKU, Qty) on the third
+    import pandas as pd
+
+    try:
+        xl = pd.ExcelFile(file_path)
+
+        data_set = read_catalog_sheet(xl)
+
+        if len(xl.sheet_names) < 3:
+            raise ValueError("A multi-PO workbook needs a catalog sheet, a meta data sheet and an order lines sheet.")
+
+        df_meta = xl.parse(xl.sheet_names[1])
+        df_lines = xl.parse(xl.sheet_names[2])
+
+        required_columns = ['po_number', 'SKU', 'Qty']
+        missing_columns = [col for col in required_columns if col not in df_lines.columns]
+
+        if 'po_number' not in df_meta.columns:
+            missing_columns.insert(0, 'po_number (meta data sheet)')
+        if missing_columns:
+            raise ValueError(f"The workbook is missing the following columns: {', '.join(missing_columns)}.")
+
+        # Group the order lines by PO once instead of filtering per PO. A
+        # line without a PO number belongs to no PO (usually an empty row)
+        lines_by_po = {}
+        for line in df_lines[['po_number', 'SKU', 'Qty']].to_dict(orient='records'):
+            po_number = line.pop('po_number')
+            if not is_blank(po_number):
+                lines_by_po.setdefault(str(normalize_number(po_number)), []).append(line)
+
+        purchase_orders = []
+        for row in range(len(df_meta)):
+            meta_data = read_meta_row(df_meta, row)
+            purchase_orders.append((meta_data, lines_by_po.get(str(meta_data['po_number']), [])))
+
+        return data_set, purchase_orders
+
+    except ValueError as ve:
+        raise ve
+    except Exception as e:
+        raise ValueError("Error reading workbook.") from e
+
+def read_order_lines(file_path):
+
+    try:
+        # Read the raw order lines from either a JSON or a CSV file
+        if file_path.lower().endswith('.json'):
+            with open(file_path, encoding='utf-8') as f:
+                order = json.load(f)
+
+            # Accept either a bare list of lines or {"lines": [...]}
+            if isinstance(order, dict):
+                order = order.get('lines', [])
+        else:
+            with open(file_path, newline='', encoding='utf-8-sig') as f:
+                order = list(csv.DictReader(f))
+
+    except (OSError, json.JSONDecodeError, csv.Error) as e:
+        raise ValueError(f"Error reading order file: {e}") from e
+
+    if not order:
+        raise ValueError(f"The order file '{file_path}' has no order lines.")
+
+    return check_order_lines(order)
+
+def check_order_lines(order):
+    # Order lines come from files and requests: a list of objects like
+    # {"sku": ..., "qty": ...}. Raises ValueError for anything else
+    if not isinstance(order, list):
+        raise ValueError(f"The order lines must be a list of objects with a SKU and a quantity, not {type(order).__name__}.")
+
+    for line_number, line in enumerate(order, start=1):
+        if not isinstance(line, dict):
+            raise ValueError(f"Order line {line_number}: expected an object with a SKU and a quantity, got {json.dumps(line, default=str)}.")
+
+    return order
+
+def read_order_file(file_path, data_set):
+    return parse_order_lines(read_order_lines(file_path), index_by_sku(data_set))
+
+def index_by_sku(data_set):
+    # Look up the catalog rows by SKU. Spreadsheet SKUs may be numbers while
+    # the order file gives strings, so key them as strings. A Catalog
+    # already has the index
+    if isinstance(data_set, Catalog):
+        return data_set.by_sku()
+    return {str(product['SKU']): product for product in data_set}
+
+def normalize_order_line(line):
+    # Column names are matched case-insensitively ("SKU", "sku", "Qty", ...)
+    line = {str(key).strip().lower(): value for key, value in line.items()}
+    sku = line.get('sku', '')
+    sku = '' if is_blank(sku) else str(normalize_number(sku)).strip()
+    qty = normalize_number(line.get('qty', line.get('quantity', '')))
+
+    return sku, str(qty).strip()
+
+def parse_order_lines(order, products_by_sku):
+    selected_products = []
+    for line_number, line in enumerate(order, start=1):
+        sku, qty = normalize_order_line(line)
+
+        if not sku:
+            raise ValueError(f"Order line {line_number}: no SKU.")
+        if sku not in products_by_sku:
+            raise ValueError(f"Order line {line_number}: SKU '{sku}' is not in the spreadsheet.")
+        if not qty.isdigit() or int(qty) <= 0:
+            raise ValueError(f"Order line {line_number}: invalid quantity '{qty}' for SKU {sku}.")
+
+        product = products_by_sku[sku]
+        selected_products.append((int(qty), product['SKU'], product['Title'], product['Barcode']))
+
+    return selected_products
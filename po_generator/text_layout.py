@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+# Text measurement and wrapping for the PDF. Every result is memoized per
+# (text, font, size), so a PO with thousands of lines measures each distinct
+# title, quantity and barcode once, however often it appears
+
+@lru_cache(maxsize=None)
+def get_string_height(text, font_name, font_size):
+    from reportlab.pdfbase import pdfmetrics
+
+    # Get the ascent and descent of the font
+    ascent = pdfmetrics.getAscent(font_name)
+    descent = pdfmetrics.getDescent(font_name)
+
+    # Calculate the height
+    height = (ascent - descent) / 1000 * font_size
+    return height
+
+@lru_cache(maxsize=65536)
+def string_width(text, font_name, font_size):
+    # Same as canvas.stringWidth
+    from reportlab.pdfbase import pdfmetrics
+
+    return pdfmetrics.stringWidth(text, font_name, font_size)
+
+def break_word(word, font_name, font_size, max_width):
+    # Split a word that is wider than the line into pieces that fit
+    if string_width(word, font_name, font_size) <= max_width:
+        return [word]
+
+    pieces = []
+    piece = ""
+    for char in word:
+        if piece and string_width(piece + char, font_name, font_size) > max_width:
+            pieces.append(piece)
+            piece = ""
+        piece += char
+    pieces.append(piece)
+    return pieces
+
+def truncate(text, font_name, font_size, max_width, ellipsis="..."):
+    # Shorten the text until it fits with the ellipsis after it
+    while text and string_width(text + ellipsis, font_name, font_size) > max_width:
+        text = text[:-1]
+    return text.rstrip() + ellipsis
+
+@lru_cache(maxsize=65536)
+def wrap_text(text, font_name, font_size, max_width, max_lines=None):
+    # Break the text into lines no wider than max_width, at spaces where
+    # possible. Beyond max_lines the last line is cut short with "...".
+    # Returns a tuple of lines
+    space_width = string_width(" ", font_name, font_size)
+    lines = []
+    line = []
+    line_width = 0
+
+    for word in text.split():
+        for piece in break_word(word, font_name, font_size, max_width):
+            # Helvetica has no kerning, so the widths of the words add up
+            piece_width = string_width(piece, font_name, font_size)
+            if line and line_width + space_width + piece_width > max_width:
+                lines.append(" ".join(line))
+                line = []
+                line_width = 0
+            line_width += piece_width + (space_width if line else 0)
+            line.append(piece)
+
+    if line:
+        lines.append(" ".join(line))
+
+    if max_lines and len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = truncate(lines[-1], font_name, font_size, max_width)
+
+    return tuple(lines)
@@ -0,0 +1,357 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import signal
+import struct
+import select
+import json
+import time
+import sys
+import os
+
+from .spreadsheet import read_workbook
+from .cli import build_batch_jobs, render_purchase_order
+from .output import required_assets
+from .instrumentation import write_record
+
+# A burst of changes (a designer exporting a folder of PNGs, Excel saving the
+# workbook in several writes) is collected until nothing has changed for
+# DEBOUNCE_SECONDS, but never for longer than MAX_DEBOUNCE_SECONDS
+DEBOUNCE_SECONDS = 0.5
+MAX_DEBOUNCE_SECONDS = 10
+
+# How often the polling watcher scans the assets folder and the workbook
+POLL_SECONDS = 1
+
+# inotify(7) event flags
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+class InotifyWatcher:
+    # Change notifications for whole folders from the Linux kernel, through
+    # libc. Raises OSError where inotify isn't available
+    def __init__(self, folders):
+        import ctypes
+        import ctypes.util
+
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Watch descriptor -> folder
+        self.folders = {}
+        mask = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+        for folder in folders:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), mask)
+            if wd < 0:
+                error = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(error, f"Can't watch '{folder}'")
+            self.folders[wd] = folder
+
+    def changes(self, timeout=None):
+        # Paths changed since the last call, waiting up to timeout seconds
+        # (None: until something changes) for the first one. None if the
+        # kernel dropped events, so anything may have changed
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            # struct inotify_event: wd, mask, cookie, len, then the name
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = struct.unpack_from("iIII", data, offset)
+                name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+                offset += 16 + length
+
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if wd in self.folders and name:
+                    changed.add(normalize_path(os.path.join(self.folders[wd], os.fsdecode(name))))
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    # The same, by comparing the modification time and size of the watched
+    # files every POLL_SECONDS. Works on every platform and on network drives
+    def __init__(self, folders, files):
+        self.folders = folders
+        self.files = files
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for folder in self.folders:
+            try:
+                entries = list(os.scandir(folder))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[normalize_path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+
+        for file_path in self.files:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            snapshot[normalize_path(file_path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+            if deadline is None:
+                time.sleep(POLL_SECONDS)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                time.sleep(min(POLL_SECONDS, remaining))
+
+    def close(self):
+        pass
+
+def open_watcher(file_path, source_folder):
+    # inotify where the platform has it, polling everywhere else. The
+    # workbook's folder is watched rather than the workbook itself, since
+    # Excel and most editors save by replacing the file
+    folders = [os.path.abspath(source_folder)]
+    workbook_folder = os.path.dirname(os.path.abspath(file_path))
+    try:
+        watcher = InotifyWatcher(folders + [workbook_folder])
+        print("Watching for changes with inotify.")
+    except (OSError, AttributeError) as e:
+        watcher = PollingWatcher(folders, [file_path])
+        print(f"Watching for changes by polling every {POLL_SECONDS}s ({e}).")
+    return watcher
+
+def wait_for_changes(watcher, is_relevant):
+    # Block until a relevant file changes, then keep collecting changes until
+    # they settle. Returns the changed paths, or None if anything may have
+    # changed
+    changed = set()
+    while not changed:
+        paths = watcher.changes()
+        if paths is None:
+            return None
+        changed = {path for path in paths if is_relevant(path)}
+
+    give_up = time.monotonic() + MAX_DEBOUNCE_SECONDS
+    while time.monotonic() < give_up:
+        paths = watcher.changes(DEBOUNCE_SECONDS)
+        if paths is None:
+            return None
+        paths = {path for path in paths if is_relevant(path)}
+        if not paths:
+            break
+        changed |= paths
+    return changed
+
+def job_signature(selected_products, meta_data):
+    # Changes whenever anything the PO is rendered from changes in the workbook
+    key = json.dumps([selected_products, meta_data], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def dependency_map(jobs, barcode_sheet=False, source_folder="assets"):
+    # Path of every asset -> PO numbers that use it: the logo and SKU photos
+    # drawn in the PDF, and the barcode and design files copied next to it
+    # (or attached to it)
+    dependencies = {}
+    for selected_products, meta_data in jobs.values():
+        po_number = f"{meta_data.get('po_number', 'N/A')}"
+        names = ["logo.jpg"] + [f"{sku}.jpg" for qty, sku, title, barcode in selected_products]
+        names += required_assets(selected_products, barcode_sheet)
+        for name in names:
+            dependencies.setdefault(normalize_path(os.path.join(source_folder, name)), set()).add(po_number)
+    return dependencies
+
+def load_jobs(file_path):
+    # {po_number: (selected_products, meta_data)} for the POs that can be
+    # rendered, and (po_number, error) for those that can't. Raises
+    # ValueError if the workbook can't be read. build_batch_jobs fails every
+    # PO whose number is not unique, so no job replaces another here
+    data_set, purchase_orders = read_workbook(file_path)
+    jobs, failures = build_batch_jobs(data_set, purchase_orders)
+    return {f"{meta_data.get('po_number', 'N/A')}": (selected_products, meta_data) for selected_products, meta_data in jobs}, failures
+
+def start_workers(workers):
+    # The workers stay up between rounds with reportlab, the fonts and the
+    # letterhead already loaded. They are started as they are needed, so
+    # they put back the default SIGTERM handler the watch replaces
+    return ProcessPoolExecutor(max_workers=workers, initializer=signal.signal, initargs=(signal.SIGTERM, signal.SIG_DFL))
+
+def render_jobs(pool, jobs, po_numbers, render_options, use_asset_store, barcode_sheet, archive_format, stats_path):
+    # Render the given POs in the worker pool and report each one. A worker
+    # that dies (killed for memory, a crash in PIL) breaks the pool and every
+    # render still in it, so the pool is replaced and those POs are tried
+    # again one at a time: only a PO that kills its worker again fails
+    start = time.perf_counter()
+    results = {}
+
+    def submit(po_number):
+        return pool["executor"].submit(render_purchase_order, *jobs[po_number], use_asset_store, render_options, barcode_sheet, archive_format)
+
+    def restart():
+        pool["executor"].shutdown(wait=False, cancel_futures=True)
+        pool["executor"] = start_workers(pool["workers"])
+        print("A worker process died; the workers were restarted.")
+
+    futures = {}
+    broken = []
+    try:
+        for po_number in sorted(po_numbers):
+            futures[po_number] = submit(po_number)
+    except BrokenProcessPool:
+        # Broken since the last round, or while these were submitted
+        broken = [po_number for po_number in sorted(po_numbers) if po_number not in futures]
+
+    for po_number, future in futures.items():
+        try:
+            results[po_number] = future.result()[1:]
+        except BrokenProcessPool:
+            broken.append(po_number)
+        except Exception as e:
+            results[po_number] = (f"Worker failed: {e}", None)
+
+    if broken:
+        restart()
+    for po_number in sorted(broken):
+        try:
+            results[po_number] = submit(po_number).result()[1:]
+        except BrokenProcessPool:
+            results[po_number] = ("Worker failed: a worker process died while rendering it", None)
+            restart()
+        except Exception as e:
+            results[po_number] = (f"Worker failed: {e}", None)
+
+    failed = 0
+    for po_number in sorted(results):
+        error, record = results[po_number]
+
+        if stats_path and record:
+            write_record(stats_path, dict(record, mode="watch"))
+
+        if error:
+            failed += 1
+            print(f"FAILED  {po_number}: {error}")
+        else:
+            print(f"OK      {po_number}")
+
+    print(f"{len(results) - failed} of {len(results)} purchase orders updated in {time.perf_counter() - start:.1f}s.")
+
+def watch(file_path, workers=None, render_options=None, use_asset_store=False, barcode_sheet=False, archive_format=None, stats_path=None):
+    # Render every PO in a multi-PO workbook, then keep watching the workbook
+    # and the assets folder and re-render only the POs that a change affects
+    source_folder = "assets"
+    if not os.path.isdir(source_folder):
+        print(f"Source folder '{source_folder}' does not exist.", file=sys.stderr)
+        return 2
+
+    try:
+        jobs, failures = load_jobs(file_path)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    workbook_path = normalize_path(file_path)
+    source_path = normalize_path(source_folder)
+
+    def is_relevant(path):
+        return path == workbook_path or os.path.dirname(path) == source_path
+
+    # Started before the first render, so changes made during it aren't missed
+    watcher = open_watcher(file_path, source_folder)
+
+    # Replaced by render_jobs if a worker dies
+    workers = workers or os.cpu_count() or 1
+    pool = {"executor": start_workers(workers), "workers": workers}
+
+    # SIGTERM (from a service manager) stops the watch like Ctrl+C does
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        for po_number, error in failures:
+            print(f"FAILED  {po_number}: {error}")
+        render_jobs(pool, jobs, jobs.keys(), render_options, use_asset_store, barcode_sheet, archive_format, stats_path)
+        dependencies = dependency_map(jobs, barcode_sheet, source_folder)
+        print(f"Watching '{file_path}' and '{source_folder}' for {len(jobs)} purchase orders. Press Ctrl+C to stop.")
+
+        while True:
+            changed = wait_for_changes(watcher, is_relevant)
+
+            # The kernel dropped events: re-read everything. Unchanged PDFs
+            # come from the render cache and unchanged assets are linked
+            if changed is None:
+                changed = {workbook_path} | set(dependencies)
+
+            affected = set()
+            for path in changed:
+                affected |= dependencies.get(path, set())
+
+            if workbook_path in changed:
+                try:
+                    new_jobs, failures = load_jobs(file_path)
+                except ValueError as e:
+                    # Most likely caught halfway through a save; the rest of
+                    # the save will trigger another round
+                    print(f"Workbook not reloaded: {e}")
+                    new_jobs, failures = jobs, []
+
+                for po_number, error in failures:
+                    print(f"FAILED  {po_number}: {error}")
+
+                # New POs and POs whose lines or meta data changed
+                affected |= {po_number for po_number, job in new_jobs.items() if po_number not in jobs or job_signature(*job) != job_signature(*jobs[po_number])}
+                jobs = new_jobs
+                dependencies = dependency_map(jobs, barcode_sheet, source_folder)
+
+            affected &= jobs.keys()
+            names = sorted(os.path.basename(path) for path in changed)
+            if not affected:
+                print(f"Changed: {', '.join(names[:5])}{' ...' if len(names) > 5 else ''}; no purchase order affected.")
+                continue
+
+            print(f"Changed: {', '.join(names[:5])}{' ...' if len(names) > 5 else ''}; updating {len(affected)} purchase order(s).")
+            render_jobs(pool, jobs, affected, render_options, use_asset_store, barcode_sheet, archive_format, stats_path)
+
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        watcher.close()
+        pool["executor"].shutdown(cancel_futures=True)
+
+    return 0